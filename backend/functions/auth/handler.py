@@ -14,7 +14,7 @@ import sys
 # Agregar shared al path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from shared.auth.jwt_utils import generate_token
+from shared.auth.jwt_utils import generate_token, build_profile_claims
 
 dynamodb = boto3.resource('dynamodb')
 users_table = dynamodb.Table(os.environ['USERS_TABLE'])
@@ -62,8 +62,11 @@ def register(event):
         password = body.get('password', '')
         first_name = body.get('firstName', '')
         last_name = body.get('lastName', '')
-        phone_number = body.get('phoneNumber', '')
-        address = body.get('address', '')
+        # Opcionales: null equivale a no enviarlos
+        phone_number = body.get('phoneNumber')
+        phone_number = '' if phone_number is None else phone_number
+        address = body.get('address')
+        address = '' if address is None else address
         
         # SEGURIDAD: El rol siempre es USER para registro público
         # Los roles administrativos (COOK, DISPATCHER, ADMIN) deben crearse desde el panel de administración
@@ -89,6 +92,13 @@ def register(event):
                 'code': 'VALIDATION_ERROR'
             })
         
+        # Viajan como claims del token y el context del authorizer solo admite texto
+        if not all(isinstance(value, str) for value in (first_name, last_name, phone_number, address)):
+            return build_response(400, {
+                'message': 'firstName, lastName, phoneNumber y address deben ser texto',
+                'code': 'VALIDATION_ERROR'
+            })
+        
         # Verificar si el email ya existe
         response = users_table.query(
             IndexName='email-index',
@@ -121,6 +131,7 @@ def register(event):
             'address': address,
             'role': role,
             'status': 'ACTIVE',
+            'profileVersion': 1,
             'createdAt': current_time,
             'updatedAt': current_time
         }
@@ -135,7 +146,7 @@ def register(event):
         print(f"[Auth] Usuario registrado: {user_id} ({email})")
         
         # Generar token JWT
-        token = generate_token(user_id, email, role, tenant_id)
+        token = generate_token(user_id, email, role, tenant_id, build_profile_claims(user))
         
         # Retornar respuesta
         return build_response(201, {
@@ -214,7 +225,8 @@ def login(event):
             user['userId'],
             user['email'],
             user['role'],
-            user.get('tenantId')
+            user.get('tenantId'),
+            build_profile_claims(user)
         )
         
         # Retornar respuesta
@@ -0,0 +1,220 @@
+"""
+Lambda: ImageProcessor
+Descripción: Procesa las imágenes de productos subidas con URL prefirmada
+Entrada: Evento S3 ObjectCreated sobre uploads/<tenantId>/<productId>/<uploadId>.<ext>
+Salida: Imagen definitiva (y variantes redimensionadas) en images/ y
+        imageKey/imageUrl/imageVariants actualizados en el producto
+"""
+
+import io
+import os
+import boto3
+import sys
+from datetime import datetime
+from urllib.parse import unquote_plus
+
+# Agregar shared al path para importar helpers
+sys.path.insert(0, '/opt/python')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../shared'))
+
+from menu.menu_refresh import load_menu_products, write_menu_snapshots, write_search_index
+from menu.menu_version import bump_menu_version, UnknownTenantError
+from menu.product_images import (
+    CONTENT_TYPES_BY_EXTENSION,
+    build_image_key,
+    build_image_url,
+    parse_upload_key
+)
+
+# Pillow viene en la capa de requirements.txt (wheel binaria: empaquetar desde
+# Linux o con dockerizePip). Si no se puede importar solo se publica el
+# original, sin variantes
+try:
+    from PIL import Image, UnidentifiedImageError
+except ImportError:
+    Image = None
+    UnidentifiedImageError = None
+
+dynamodb = boto3.resource('dynamodb')
+s3 = boto3.client('s3')
+
+products_table = dynamodb.Table(os.environ['PRODUCTS_TABLE'])
+images_base_url = os.environ.get('IMAGES_BASE_URL')
+
+MAX_IMAGE_BYTES = int(os.environ.get('MAX_IMAGE_BYTES', str(5 * 1024 * 1024)))
+VARIANT_WIDTHS = [int(width) for width in os.environ.get('IMAGE_VARIANT_WIDTHS', '320,640').split(',') if width]
+
+# Las keys definitivas incluyen el uploadId: nunca se sobreescriben
+IMAGE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+PIL_FORMATS = {'jpg': 'JPEG', 'png': 'PNG', 'webp': 'WEBP'}
+
+
+def handler(event, context):
+    """
+    Procesa cada objeto subido del evento S3
+    """
+    processed = 0
+    for record in event.get('Records', []):
+        bucket = record['s3']['bucket']['name']
+        key = unquote_plus(record['s3']['object']['key'])
+        size = record['s3']['object'].get('size', 0)
+        try:
+            if process_upload(bucket, key, size):
+                processed += 1
+        except Exception as e:
+            # Se propaga para que S3/Lambda reintente la invocación
+            print(f"[ImageProcessor] Error al procesar {key}: {str(e)}")
+            raise
+
+    print(f"[ImageProcessor] {processed}/{len(event.get('Records', []))} imágenes procesadas")
+    return {'processed': processed}
+
+
+def process_upload(bucket, key, size):
+    """
+    Publica la imagen subida y la registra en el producto.
+    Retorna False si la subida se descartó.
+    """
+    parsed = parse_upload_key(key)
+    if not parsed:
+        print(f"[ImageProcessor] Key fuera de convención, se ignora: {key}")
+        return False
+    tenant_id, product_id, upload_id, extension = parsed
+
+    if size > MAX_IMAGE_BYTES:
+        print(f"[ImageProcessor] {key} excede {MAX_IMAGE_BYTES} bytes ({size}), se descarta")
+        s3.delete_object(Bucket=bucket, Key=key)
+        return False
+
+    content_type = CONTENT_TYPES_BY_EXTENSION[extension]
+    image_key = build_image_key(tenant_id, product_id, upload_id, extension)
+    s3.copy_object(
+        Bucket=bucket,
+        Key=image_key,
+        CopySource={'Bucket': bucket, 'Key': key},
+        ContentType=content_type,
+        CacheControl=IMAGE_CACHE_CONTROL,
+        MetadataDirective='REPLACE'
+    )
+
+    variants = generate_variants(bucket, key, tenant_id, product_id, upload_id, extension, content_type)
+
+    # Registrar la imagen solo si el producto sigue existiendo en el mismo tenant
+    try:
+        response = products_table.update_item(
+            Key={'productId': product_id},
+            UpdateExpression='SET imageKey = :imageKey, imageUrl = :imageUrl, '
+                             'imageVariants = :imageVariants, updatedAt = :updatedAt',
+            ConditionExpression='attribute_exists(productId) AND tenantId = :tenantId',
+            ExpressionAttributeValues={
+                ':imageKey': image_key,
+                ':imageUrl': build_image_url(get_images_base_url(bucket), image_key),
+                ':imageVariants': {
+                    str(width): build_image_url(get_images_base_url(bucket), variant_key)
+                    for width, variant_key in variants.items()
+                },
+                ':updatedAt': datetime.utcnow().isoformat() + 'Z',
+                ':tenantId': tenant_id
+            },
+            ReturnValues='ALL_NEW'
+        )
+    except products_table.meta.client.exceptions.ConditionalCheckFailedException:
+        print(f"[ImageProcessor] Producto {product_id} no existe en {tenant_id}, se descarta la imagen")
+        s3.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': k} for k in [key, image_key, *variants.values()]]}
+        )
+        return False
+
+    s3.delete_object(Bucket=bucket, Key=key)
+
+    refresh_menu(bucket, tenant_id, response['Attributes'])
+
+    print(f"[ImageProcessor] Imagen de {product_id} publicada: {image_key} "
+          f"({len(variants)} variantes)")
+    return True
+
+
+def refresh_menu(bucket, tenant_id, product):
+    """
+    Sube la versión del menú y regenera sus snapshots e índice de búsqueda
+    con el producto recién escrito aplicado sobre la lectura del GSI
+    (eventualmente consistente). No crítico: si falla, se regeneran en la
+    siguiente lectura.
+    """
+    try:
+        version = bump_menu_version(tenant_id)
+    except UnknownTenantError:
+        print(f"[ImageProcessor] La sede {tenant_id} no existe, no se regenera su menú")
+        return
+    except Exception as e:
+        print(f"[ImageProcessor] Error al actualizar versión del menú (no crítico): {str(e)}")
+        return
+
+    try:
+        products = load_menu_products(products_table, tenant_id, [product])
+        write_menu_snapshots(s3, bucket, tenant_id, version, products)
+        write_search_index(s3, bucket, tenant_id, version, products)
+    except Exception as e:
+        print(f"[ImageProcessor] Error al regenerar snapshot/índice del menú (no crítico): {str(e)}")
+
+
+def get_images_base_url(bucket):
+    """
+    Dominio público de images/ (IMAGES_BASE_URL o el endpoint regional del bucket)
+    """
+    return images_base_url or f"https://{bucket}.s3.{os.environ.get('AWS_REGION', 'us-east-1')}.amazonaws.com"
+
+
+def generate_variants(bucket, key, tenant_id, product_id, upload_id, extension, content_type):
+    """
+    Genera las variantes redimensionadas (solo reduce, conserva proporción).
+    Retorna {ancho: key}. Sin Pillow, o si la imagen no se puede decodificar
+    (archivo corrupto o formato no soportado), retorna {} y se publica solo
+    el original: reintentar fallaría igual. Los errores de S3 se propagan.
+    """
+    if Image is None:
+        print("[ImageProcessor] Pillow no disponible, se omiten variantes")
+        return {}
+
+    body = s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+    try:
+        rendered = render_variants(body, extension)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError) as e:
+        print(f"[ImageProcessor] No se pudo decodificar {key}, se omiten variantes: {str(e)}")
+        return {}
+
+    variants = {}
+    for width, data in rendered.items():
+        variant_key = build_image_key(tenant_id, product_id, upload_id, extension, width)
+        s3.put_object(
+            Bucket=bucket,
+            Key=variant_key,
+            Body=data,
+            ContentType=content_type,
+            CacheControl=IMAGE_CACHE_CONTROL
+        )
+        variants[width] = variant_key
+
+    return variants
+
+
+def render_variants(body, extension):
+    """
+    Redimensiona la imagen en memoria. Retorna {ancho: bytes}
+    """
+    rendered = {}
+    with Image.open(io.BytesIO(body)) as original:
+        for width in VARIANT_WIDTHS:
+            if original.width <= width:
+                continue
+            height = round(original.height * width / original.width)
+            resized = original.resize((width, height))
+            if extension == 'jpg' and resized.mode not in ('RGB', 'L'):
+                resized = resized.convert('RGB')
+
+            buffer = io.BytesIO()
+            resized.save(buffer, format=PIL_FORMATS[extension])
+            rendered[width] = buffer.getvalue()
+    return rendered
@@ -0,0 +1,173 @@
+"""
+Lambda: OrderEventsRelay
+Descripción: Publica en EventBridge los eventos de órdenes (ORDER_CREATED,
+             ORDER_STATUS_CHANGED) a partir del stream de la tabla de órdenes
+Entrada: Lote de registros del stream de DynamoDB (NEW_AND_OLD_IMAGES)
+Salida: batchItemFailures con el primer registro sin publicar
+
+Cada orden escrita en DynamoDB queda en el stream, así ningún cambio
+persistido se pierde aunque EventBridge falle. Los eventos se publican en
+el orden del stream, en bloques de hasta 10 entradas y 256 KB. Si un bloque
+falla por un error transitorio se corta ahí y se reporta ese registro:
+Lambda reintenta el lote desde él (los consumidores pueden recibir
+duplicados, nunca desordenados).
+
+Los eventos que EventBridge rechaza por contenido (ValidationException,
+entrada demasiado grande, detail inválido) no se reintentan: nunca se
+publicarían y bloquearían el shard. Se envían a la cola ORDER_EVENTS_DLQ_URL
+y el relay sigue con los siguientes.
+"""
+
+import json
+import os
+import boto3
+import sys
+
+# Agregar shared al path para importar helpers
+sys.path.insert(0, '/opt/python')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../shared'))
+
+from orders.order_events import events_from_stream_record, build_event_entry
+
+eventbridge = boto3.client('events')
+sqs = boto3.client('sqs')
+event_bus_name = os.environ.get('EVENT_BUS_NAME', 'default')
+dlq_url = os.environ.get('ORDER_EVENTS_DLQ_URL')
+
+# Límites de una llamada a put_events
+PUT_EVENTS_MAX_ENTRIES = 10
+PUT_EVENTS_MAX_BYTES = 256 * 1024
+
+# Códigos de error por entrada que vale la pena reintentar
+RETRYABLE_ERROR_CODES = ('InternalFailure', 'InternalException', 'ThrottlingException')
+
+
+class RetryableError(Exception):
+    """Fallo transitorio: el lote se reintenta desde el registro que falló"""
+    pass
+
+
+def handler(event, context):
+    """
+    Traduce los registros del stream a eventos y los publica en orden
+    """
+    records = event.get('Records', [])
+    print(f"[OrderEventsRelay] {len(records)} registros recibidos")
+
+    # (sequenceNumber del registro, entrada de put_events), en orden del stream
+    pending = []
+    for record in records:
+        sequence_number = record['dynamodb']['SequenceNumber']
+        for detail_type, detail in events_from_stream_record(record):
+            pending.append((sequence_number, build_event_entry(detail_type, detail, event_bus_name)))
+
+    published = 0
+    for chunk in chunk_by_size(pending):
+        try:
+            published += publish_chunk(chunk)
+        except RetryableError as e:
+            sequence_number = e.args[0]
+            print(f"[OrderEventsRelay] {published} eventos publicados; se reintenta desde el registro "
+                  f"{sequence_number}")
+            return {'batchItemFailures': [{'itemIdentifier': sequence_number}]}
+
+    print(f"[OrderEventsRelay] {published} eventos publicados")
+    return {'batchItemFailures': []}
+
+
+def entry_size(entry):
+    """
+    Tamaño de una entrada según el cálculo de EventBridge (Time cuenta 14 bytes)
+    """
+    return 14 + sum(len(entry[field].encode('utf-8')) for field in ('Source', 'DetailType', 'Detail'))
+
+
+def chunk_by_size(pending):
+    """
+    Agrupa las entradas en bloques de hasta 10 entradas y 256 KB, sin
+    cambiar el orden. Una entrada que sola supera el límite va en su propio
+    bloque (publish_chunk la envía a la DLQ).
+    """
+    chunks = []
+    current = []
+    current_bytes = 0
+    for sequence_number, entry in pending:
+        size = entry_size(entry)
+        if current and (len(current) == PUT_EVENTS_MAX_ENTRIES or current_bytes + size > PUT_EVENTS_MAX_BYTES):
+            chunks.append(current)
+            current = []
+            current_bytes = 0
+        current.append((sequence_number, entry))
+        current_bytes += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def publish_chunk(chunk):
+    """
+    Publica un bloque y retorna cuántos eventos se publicaron. Los rechazos
+    definitivos van a la DLQ.
+
+    Raises:
+        RetryableError: con el sequenceNumber del primer evento que falló
+        por un error transitorio
+    """
+    if len(chunk) == 1 and entry_size(chunk[0][1]) > PUT_EVENTS_MAX_BYTES:
+        send_to_dlq(chunk[0], 'EntryTooLarge', f"{entry_size(chunk[0][1])} bytes")
+        return 0
+
+    try:
+        response = eventbridge.put_events(Entries=[entry for _, entry in chunk])
+    except eventbridge.exceptions.ClientError as e:
+        if e.response['Error']['Code'] != 'ValidationException':
+            print(f"[OrderEventsRelay] Error en put_events: {str(e)}")
+            raise RetryableError(chunk[0][0])
+        if len(chunk) > 1:
+            # Se publica uno por uno para aislar la entrada inválida
+            return sum(publish_chunk([item]) for item in chunk)
+        send_to_dlq(chunk[0], 'ValidationException', e.response['Error'].get('Message'))
+        return 0
+    except Exception as e:
+        print(f"[OrderEventsRelay] Error en put_events: {str(e)}")
+        raise RetryableError(chunk[0][0])
+
+    if response.get('FailedEntryCount', 0) == 0:
+        return len(chunk)
+
+    published = 0
+    for item, result in zip(chunk, response['Entries']):
+        if 'EventId' in result:
+            published += 1
+            continue
+        error_code = result.get('ErrorCode')
+        if error_code in RETRYABLE_ERROR_CODES:
+            print(f"[OrderEventsRelay] Evento rechazado: {error_code} {result.get('ErrorMessage')}")
+            raise RetryableError(item[0])
+        send_to_dlq(item, error_code, result.get('ErrorMessage'))
+    return published
+
+
+def send_to_dlq(item, error_code, error_message):
+    """
+    Envía a la DLQ un evento que EventBridge no aceptará nunca. Si la DLQ
+    no responde, el registro se reintenta.
+    """
+    sequence_number, entry = item
+    print(f"[OrderEventsRelay] Evento descartado a la DLQ ({sequence_number}): {error_code} {error_message}")
+    try:
+        sqs.send_message(
+            QueueUrl=dlq_url,
+            MessageBody=json.dumps({
+                'reason': 'REJECTED_BY_EVENTBRIDGE',
+                'errorCode': error_code,
+                'errorMessage': error_message,
+                'sequenceNumber': sequence_number,
+                'detailType': entry['DetailType'],
+                # El detail se recorta: el registro completo sigue en la tabla de órdenes
+                'detail': entry['Detail'][:100 * 1024]
+            })
+        )
+    except Exception as e:
+        print(f"[OrderEventsRelay] Error al enviar a la DLQ: {str(e)}")
+        raise RetryableError(sequence_number)
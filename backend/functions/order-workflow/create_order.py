@@ -3,23 +3,75 @@ Lambda: CreateOrder
 Descripción: Lambda que inicia el Step Function orderWorkflow
 Endpoint: POST /orders
 Body: { "items": [...], "notes": "...", "paymentMethod": "..." }
+Header opcional: Idempotency-Key (reintentos del cliente retornan la
+respuesta original sin crear otra orden)
+
+ORDER_FAST_MODE elige cómo se ejecuta el workflow:
+- standard (default): start_execution del Step Function Standard, responde
+  202 con el executionArn
+- express: start_sync_execution del Step Function Express (misma definición),
+  responde 201 con la orden creada
+- inprocess: ejecuta PrepareOrderData -> PersistAndBuildOrder dentro de
+  esta Lambda, con la misma política de reintentos de la máquina de
+  estados, y responde 201 con la orden creada
+
+En todos los modos ORDER_CREATED lo publica orderEventsRelay desde el
+stream de la tabla de órdenes.
 """
 
 import json
 import os
 import boto3
+import hashlib
+import time
+import uuid
 from datetime import datetime
+from decimal import Decimal
 import sys
 
 # Agregar shared al path para importar helpers
 sys.path.insert(0, '/opt/python')
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../shared'))
 
-from auth.auth_context import get_auth_context, AuthorizationError
+from auth.auth_context import get_auth_context, get_profile_claims, AuthorizationError
+from menu.menu_version import get_menu_version
+from utils.idempotency import get_result, save_result
+from utils.ttl_cache import TTLCache
 
 stepfunctions = boto3.client('stepfunctions')
+dynamodb = boto3.resource('dynamodb')
+products_table = dynamodb.Table(os.environ['PRODUCTS_TABLE'])
+
+# productIds disponibles por tenant para la validación previa del carrito.
+# Clave: (tenantId, versión del menú)
+available_products_cache = TTLCache(
+    max_entries=int(os.environ.get('AVAILABLE_PRODUCTS_CACHE_MAX_ENTRIES', '64')),
+    ttl_seconds=float(os.environ.get('AVAILABLE_PRODUCTS_CACHE_TTL_SECONDS', '60')),
+    name='available-products'
+)
 
 state_machine_arn = os.environ['STATE_MACHINE_ARN']
+express_state_machine_arn = os.environ.get('EXPRESS_STATE_MACHINE_ARN')
+
+ORDER_FAST_MODE = os.environ.get('ORDER_FAST_MODE', 'standard')
+
+# Idempotency-Key: vigencia del registro y espacio de nombres del requestId derivado
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_KEY_TTL_SECONDS', str(24 * 60 * 60)))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+REQUEST_ID_NAMESPACE = uuid.UUID('0b8e6d52-3f41-5c9a-8e27-4d6a1b9c7f30')
+
+# Misma política que el Retry de cada estado de orderWorkflow
+STEP_RETRY_ATTEMPTS = 2
+STEP_RETRY_INTERVAL_SECONDS = 2
+STEP_RETRY_BACKOFF_RATE = 1.5
+
+
+class WorkflowError(Exception):
+    """Excepción lanzada cuando el workflow de la orden falla en modo síncrono"""
+    
+    def __init__(self, message, validation=False):
+        super().__init__(message)
+        self.validation = validation
 
 
 def handler(event, context):
@@ -41,6 +93,22 @@ def handler(event, context):
         # Extraer body
         body = json.loads(event.get('body', '{}'))
         
+        # Reintento del cliente con la misma Idempotency-Key: respuesta original
+        idempotency_key = get_header(event, 'Idempotency-Key')
+        record_key = None
+        request_hash = None
+        if idempotency_key is not None:
+            if not idempotency_key or len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+                return build_response(400, {
+                    'message': f'Idempotency-Key debe tener entre 1 y {IDEMPOTENCY_KEY_MAX_LENGTH} caracteres',
+                    'code': 'VALIDATION_ERROR'
+                })
+            record_key = f"orders#{auth['userId']}#{idempotency_key}"
+            request_hash = hashlib.sha256(json.dumps(body, sort_keys=True).encode('utf-8')).hexdigest()
+            previous = get_result(record_key)
+            if previous is not None:
+                return replay_response(previous, request_hash)
+        
         # Validar campos requeridos
         items = body.get('items', [])
         if not items:
@@ -49,8 +117,16 @@ def handler(event, context):
                 'code': 'VALIDATION_ERROR'
             })
         
-        # Construir input para el Step Function
+        # Construir input para el Step Function. El requestId identifica la
+        # orden en todos los pasos (orderId determinístico, idempotencia);
+        # con Idempotency-Key se deriva de ella para que los reintentos
+        # concurrentes apunten a la misma ejecución y la misma orden
+        if record_key:
+            request_id = str(uuid.uuid5(REQUEST_ID_NAMESPACE, record_key))
+        else:
+            request_id = str(uuid.uuid4())
         workflow_input = {
+            'requestId': request_id,
             'userId': auth['userId'],
             'tenantId': body.get('tenantId'),
             'items': items,
@@ -63,24 +139,35 @@ def handler(event, context):
         if auth.get('tenantId'):
             workflow_input['tenantId'] = auth['tenantId']
         
-        # Iniciar ejecución del Step Function
-        print(f"[CreateOrder] Iniciando Step Function con input: {json.dumps(workflow_input)}")
+        # Perfil del token: PrepareOrderData lo usa en lugar de leer la tabla de usuarios
+        profile = get_profile_claims(event)
+        if profile:
+            workflow_input['userProfile'] = profile
         
-        response = stepfunctions.start_execution(
-            stateMachineArn=state_machine_arn,
-            input=json.dumps(workflow_input, default=str)
-        )
+        # Rechazar carritos inválidos antes de iniciar el workflow
+        validation_error = validate_cart(workflow_input['tenantId'], items)
+        if validation_error:
+            print(f"[CreateOrder] Carrito rechazado: {validation_error['message']}")
+            return build_response(400, dict(validation_error, code='VALIDATION_ERROR'))
         
-        execution_arn = response['executionArn']
+        if ORDER_FAST_MODE in ('express', 'inprocess'):
+            response = create_order_sync(workflow_input)
+        else:
+            response = start_order_workflow(workflow_input)
         
-        print(f"[CreateOrder] Step Function iniciado: {execution_arn}")
+        # Guardar la respuesta exitosa para los reintentos con la misma clave
+        if record_key and response['statusCode'] in (201, 202):
+            save_result(
+                record_key,
+                {
+                    'statusCode': response['statusCode'],
+                    'body': json.loads(response['body']),
+                    'requestHash': request_hash
+                },
+                ttl_seconds=IDEMPOTENCY_KEY_TTL_SECONDS
+            )
         
-        # Retornar respuesta
-        return build_response(202, {
-            'message': 'Orden en proceso de creación',
-            'executionArn': execution_arn,
-            'status': 'PROCESSING'
-        })
+        return response
         
     except Exception as e:
         print(f"[CreateOrder] Error inesperado: {str(e)}")
@@ -93,17 +180,265 @@ def handler(event, context):
         })
 
 
-def build_response(status_code, body):
+def start_order_workflow(workflow_input):
+    """
+    Inicia el Step Function Standard y responde 202 con el executionArn
+    """
+    request_id = workflow_input['requestId']
+    print(f"[CreateOrder] Iniciando Step Function con input: {json.dumps(workflow_input)}")
+    
+    try:
+        response = stepfunctions.start_execution(
+            stateMachineArn=state_machine_arn,
+            name=request_id,
+            input=json.dumps(workflow_input, default=str)
+        )
+        execution_arn = response['executionArn']
+        print(f"[CreateOrder] Step Function iniciado: {execution_arn}")
+    except stepfunctions.exceptions.ExecutionAlreadyExists:
+        # Reintento concurrente con la misma Idempotency-Key: la ejecución ya existe
+        execution_arn = build_execution_arn(request_id)
+        print(f"[CreateOrder] Ejecución {request_id} ya iniciada: {execution_arn}")
+    
+    return build_response(202, {
+        'message': 'Orden en proceso de creación',
+        'executionArn': execution_arn,
+        'status': 'PROCESSING'
+    })
+
+
+def build_execution_arn(execution_name):
+    """
+    ARN de una ejecución de orderWorkflow a partir de su nombre
+    """
+    return state_machine_arn.replace(':stateMachine:', ':execution:') + f":{execution_name}"
+
+
+def replay_response(previous, request_hash):
+    """
+    Respuesta a un reintento con una Idempotency-Key ya usada
+    """
+    # La misma clave con otro body es un error del cliente, no un reintento
+    if previous.get('requestHash') != request_hash:
+        return build_response(422, {
+            'message': 'Idempotency-Key ya fue usada con otro body',
+            'code': 'IDEMPOTENCY_KEY_REUSED'
+        })
+    print(f"[CreateOrder] Respuesta repetida por Idempotency-Key ({previous['statusCode']})")
+    return build_response(previous['statusCode'], previous['body'], {'Idempotent-Replayed': 'true'})
+
+
+def get_header(event, name):
+    """
+    Lee un header sin distinguir mayúsculas/minúsculas
+    """
+    headers = event.get('headers') or {}
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def validate_cart(tenant_id, items):
+    """
+    Validación previa y barata del carrito. Retorna None si es válido o
+    {'message', 'details'} con el motivo del rechazo.
+    
+    PrepareOrderData vuelve a validar todo; aquí solo se descartan los
+    carritos que fallarían con seguridad, sin gastar una ejecución.
+    """
+    if not tenant_id:
+        return {'message': 'tenantId es requerido'}
+    
+    if not isinstance(items, list):
+        return {'message': 'items debe ser una lista'}
+    
+    for item in items:
+        if not isinstance(item, dict) or not item.get('productId'):
+            return {'message': 'Cada item debe tener un productId'}
+        quantity = item.get('quantity', 1)
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+            return {'message': f"Cantidad inválida para producto {item['productId']}"}
+    
+    try:
+        available = get_available_product_ids(tenant_id)
+    except Exception as e:
+        # Sin el mapa no se rechaza nada: PrepareOrderData valida igual
+        print(f"[CreateOrder] Error en validación previa (no crítico): {str(e)}")
+        return None
+    
+    invalid = sorted({item['productId'] for item in items} - available)
+    if invalid:
+        return {
+            'message': 'Productos no encontrados, no disponibles o de otra sede',
+            'details': {'productIds': invalid}
+        }
+    return None
+
+
+def get_available_product_ids(tenant_id):
+    """
+    Retorna el set de productIds disponibles del tenant, leído del GSI
+    disperso availableTenantId-index y cacheado por versión del menú
+    """
+    cache_key = (tenant_id, get_menu_version(tenant_id))
+    available = available_products_cache.get(cache_key)
+    if available is not None:
+        return available
+    
+    available = set()
+    request_params = {
+        'IndexName': 'availableTenantId-index',
+        'KeyConditionExpression': 'availableTenantId = :tenantId',
+        'ExpressionAttributeValues': {':tenantId': tenant_id},
+        'ProjectionExpression': 'productId'
+    }
+    while True:
+        response = products_table.query(**request_params)
+        available.update(item['productId'] for item in response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        request_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    
+    available_products_cache.set(cache_key, available)
+    stats = available_products_cache.stats()
+    print(f"[CreateOrder] {len(available)} productos disponibles en {tenant_id} "
+          f"(cache hits={stats['hits']}, misses={stats['misses']})")
+    return available
+
+
+def create_order_sync(workflow_input):
+    """
+    Crea la orden de forma síncrona (modo express o inprocess) y responde
+    con el orderId y el total
+    """
+    started_at = time.perf_counter()
+    try:
+        if ORDER_FAST_MODE == 'express':
+            order = run_express_workflow(workflow_input)
+        else:
+            order = run_workflow_in_process(workflow_input)
+    except WorkflowError as e:
+        print(f"[CreateOrder] Workflow fallido ({ORDER_FAST_MODE}): {str(e)}")
+        if e.validation:
+            return build_response(400, {
+                'message': str(e),
+                'code': 'VALIDATION_ERROR'
+            })
+        return build_response(500, {
+            'message': 'Error al crear la orden',
+            'code': 'WORKFLOW_ERROR',
+            'details': str(e)
+        })
+    
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    print(f"[CreateOrder] Orden {order['orderId']} creada en {elapsed_ms:.0f} ms ({ORDER_FAST_MODE})")
+    
+    return build_response(201, {
+        'message': 'Orden creada exitosamente',
+        'orderId': order['orderId'],
+        'total': order.get('total'),
+        'status': order.get('status', 'CREATED'),
+        'createdAt': order.get('createdAt')
+    })
+
+
+def run_express_workflow(workflow_input):
+    """
+    Ejecuta el Step Function Express y espera su resultado
+    """
+    response = stepfunctions.start_sync_execution(
+        stateMachineArn=express_state_machine_arn,
+        name=workflow_input['requestId'],
+        input=json.dumps(workflow_input, default=str)
+    )
+    
+    if response['status'] == 'SUCCEEDED':
+        return json.loads(response['output'])
+    
+    # WorkflowFailed propaga el error del estado que falló (ErrorPath/CausePath)
+    message = get_lambda_error_message(response.get('cause')) or response.get('error') or response['status']
+    raise WorkflowError(message, validation=message.startswith('VALIDATION_ERROR'))
+
+
+def get_lambda_error_message(cause):
+    """
+    Extrae errorMessage del Cause de una Lambda fallida (JSON serializado)
+    """
+    if not cause:
+        return None
+    try:
+        return json.loads(cause).get('errorMessage', cause)
+    except (ValueError, AttributeError):
+        return cause
+
+
+def run_workflow_in_process(workflow_input):
+    """
+    Ejecuta los pasos del workflow en esta Lambda. Entre pasos el estado se
+    serializa a JSON igual que en Step Functions.
+    """
+    # Los pasos viven en el mismo directorio; se importan solo en este modo
+    sys.path.insert(0, os.path.dirname(__file__))
+    import prepare_order_data
+    import persist_and_build_order
+    
+    state = workflow_input
+    for step_name, step in (
+        ('PrepareOrderData', prepare_order_data),
+        ('PersistAndBuildOrder', persist_and_build_order)
+    ):
+        state = run_step(step_name, step.handler, state)
+    return state
+
+
+def run_step(step_name, step_handler, state):
+    """
+    Ejecuta un paso con los reintentos del estado equivalente. Los errores
+    de validación no se reintentan: con la misma entrada fallarían igual.
+    """
+    for attempt in range(STEP_RETRY_ATTEMPTS + 1):
+        try:
+            return to_state(step_handler(state, None))
+        except Exception as e:
+            message = str(e)
+            validation = message.startswith('VALIDATION_ERROR')
+            if validation or attempt == STEP_RETRY_ATTEMPTS:
+                raise WorkflowError(message, validation=validation)
+            delay = STEP_RETRY_INTERVAL_SECONDS * (STEP_RETRY_BACKOFF_RATE ** attempt)
+            print(f"[CreateOrder] {step_name} falló ({message}), reintento {attempt + 1} en {delay:.1f}s")
+            time.sleep(delay)
+
+
+def to_state(output):
+    """
+    Serializa la salida de un paso como lo haría Lambda/Step Functions
+    (los Decimal pasan a número)
+    """
+    return json.loads(json.dumps(output, default=decimal_to_number))
+
+
+def decimal_to_number(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def build_response(status_code, body, extra_headers=None):
     """
     Construye una respuesta HTTP estandarizada
     """
+    headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type,Authorization,Idempotency-Key',
+        'Access-Control-Allow-Methods': 'POST,OPTIONS'
+    }
+    if extra_headers:
+        headers.update(extra_headers)
     return {
         'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-            'Access-Control-Allow-Methods': 'POST,OPTIONS'
-        },
+        'headers': headers,
         'body': json.dumps(body, default=str)
     }
@@ -0,0 +1,356 @@
+"""
+Lambda: CreateOrdersBatch
+Descripción: Carga masiva de órdenes (agregadores, catering)
+Endpoint: POST /orders/batch
+Body: { "orders": [ { "externalId": "...", "items": [...], "notes": "...",
+        "paymentMethod": "...", "deliveryAddress": "...",
+        "customer": { "firstName", "lastName", "email", "phoneNumber", "address" } } ] }
+
+Camino por lotes dentro de la Lambda en lugar de una ejecución del Step
+Function por orden:
+1. Una sola lectura BatchGetItem con los productos de todas las órdenes
+2. Validación y armado de cada orden con las mismas reglas que
+   PrepareOrderData / PersistAndBuildOrder (orders/order_builder.py)
+3. Escritura en bloques: las órdenes con externalId con Put condicional
+   (TransactWriteItems, attribute_not_exists) para que dos envíos
+   concurrentes del mismo lote no se pisen; el resto con BatchWriteItem
+   (en paralelo)
+
+Los eventos ORDER_CREATED los publica orderEventsRelay desde el stream de la
+tabla de órdenes, igual que para POST /orders.
+
+Responde el resultado de cada orden, en el orden recibido:
+CREATED, INVALID, DUPLICATE (externalId ya cargado) o FAILED.
+"""
+
+import json
+import os
+import boto3
+import uuid
+from datetime import datetime
+import sys
+
+# Agregar shared al path para importar helpers
+sys.path.insert(0, '/opt/python')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../shared'))
+
+from auth.auth_context import get_auth_context, require_role, require_tenant, AuthorizationError
+from orders.order_builder import (
+    validate_items,
+    enrich_items,
+    normalize_product,
+    build_order_record
+)
+from utils.dynamo_batch import batch_get_items, batch_write_items, transact_write_actions
+
+dynamodb = boto3.resource('dynamodb')
+orders_table = dynamodb.Table(os.environ['ORDERS_TABLE'])
+products_table = dynamodb.Table(os.environ['PRODUCTS_TABLE'])
+
+BATCH_MAX_ORDERS = int(os.environ.get('BATCH_MAX_ORDERS', '500'))
+EXTERNAL_ID_MAX_LENGTH = 128
+
+# orderId = uuid5(namespace, "<tenantId>#<externalId>"): recargar el mismo
+# lote no duplica órdenes
+EXTERNAL_ORDER_ID_NAMESPACE = uuid.UUID('3d7a9c1e-52b4-5f86-a0d9-8e1f4b6c2a75')
+
+PRODUCT_FIELDS = ['productId', 'tenantId', 'name', 'price', 'preparationTimeMinutes', 'preparationTime']
+CUSTOMER_FIELDS = ['firstName', 'lastName', 'email', 'phoneNumber', 'address']
+
+
+def handler(event, context):
+    """
+    Valida y persiste un lote de órdenes
+    """
+    try:
+        print(f"[CreateOrdersBatch] Evento recibido: {event.get('httpMethod')} {event.get('path')}")
+
+        try:
+            auth = get_auth_context(event)
+            require_role(auth, ['ADMIN'])
+            tenant_id = require_tenant(auth)
+        except AuthorizationError as e:
+            return build_response(403, {
+                'message': str(e),
+                'code': 'FORBIDDEN'
+            })
+
+        try:
+            body = json.loads(event.get('body') or '{}')
+        except json.JSONDecodeError:
+            return build_response(400, {
+                'message': 'Body inválido',
+                'code': 'VALIDATION_ERROR'
+            })
+
+        orders = body.get('orders')
+        if not isinstance(orders, list) or not orders:
+            return build_response(400, {
+                'message': 'orders es requerido y no puede estar vacío',
+                'code': 'VALIDATION_ERROR'
+            })
+
+        if len(orders) > BATCH_MAX_ORDERS:
+            return build_response(400, {
+                'message': f'Máximo {BATCH_MAX_ORDERS} órdenes por lote',
+                'code': 'VALIDATION_ERROR',
+                'details': {'received': len(orders)}
+            })
+
+        results = [None] * len(orders)
+
+        # 1. Validar la forma de cada orden (sin I/O)
+        candidates = []
+        for index, order_input in enumerate(orders):
+            try:
+                candidates.append((index, parse_order_input(order_input, tenant_id)))
+            except ValueError as e:
+                results[index] = build_result(index, order_input, 'INVALID', message=str(e))
+
+        # 2. Una sola lectura de productos para todo el lote
+        product_ids = {
+            item['productId']
+            for _, order_input in candidates
+            for item in order_input['items']
+        }
+        products = fetch_products(product_ids)
+
+        # 3. Enriquecer y armar cada orden
+        current_time = datetime.utcnow().isoformat() + 'Z'
+        records = []
+        for index, order_input in candidates:
+            try:
+                records.append((index, build_order(order_input, products, tenant_id, auth['userId'], current_time)))
+            except ValueError as e:
+                results[index] = build_result(index, order_input, 'INVALID', message=str(e))
+
+        # 4. Descartar las órdenes ya cargadas (mismo externalId). Es solo un
+        # filtro barato: la garantía la da el Put condicional del paso 5
+        existing = find_existing_orders([order['orderId'] for _, order in records])
+        pending = []
+        seen = set()
+        for index, order in records:
+            if order['orderId'] in existing or order['orderId'] in seen:
+                results[index] = build_result(index, orders[index], 'DUPLICATE', order_id=order['orderId'])
+            else:
+                seen.add(order['orderId'])
+                pending.append((index, order))
+
+        # 5. Persistir
+        duplicated, failed_writes = write_orders([order for _, order in pending])
+        for index, order in pending:
+            if order['orderId'] in duplicated:
+                results[index] = build_result(index, orders[index], 'DUPLICATE', order_id=order['orderId'])
+            elif order['orderId'] in failed_writes:
+                results[index] = build_result(index, orders[index], 'FAILED', order_id=order['orderId'],
+                                              message=failed_writes[order['orderId']])
+            else:
+                results[index] = build_result(index, orders[index], 'CREATED', order_id=order['orderId'],
+                                              total=order['total'])
+
+        summary = {}
+        for result in results:
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+        print(f"[CreateOrdersBatch] Lote de {len(orders)} órdenes en {tenant_id}: {summary}")
+
+        all_created = summary.get('CREATED', 0) == len(orders)
+        return build_response(201 if all_created else 207, {
+            'message': 'Lote procesado',
+            'summary': summary,
+            'results': results
+        })
+
+    except Exception as e:
+        print(f"[CreateOrdersBatch] Error inesperado: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return build_response(500, {
+            'message': 'Error interno del servidor',
+            'code': 'INTERNAL_ERROR',
+            'details': str(e)
+        })
+
+
+def parse_order_input(order_input, tenant_id):
+    """
+    Valida una orden del lote y retorna sus campos normalizados
+    """
+    if not isinstance(order_input, dict):
+        raise ValueError("Cada orden debe ser un objeto")
+
+    external_id = order_input.get('externalId')
+    if external_id is not None:
+        if not isinstance(external_id, str) or not external_id or len(external_id) > EXTERNAL_ID_MAX_LENGTH:
+            raise ValueError(f"externalId debe tener entre 1 y {EXTERNAL_ID_MAX_LENGTH} caracteres")
+
+    items = order_input.get('items')
+    if not isinstance(items, list):
+        raise ValueError("La orden debe contener al menos un item")
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError("Cada item debe tener un productId")
+        quantity = item.get('quantity', 1)
+        if not isinstance(quantity, int) or isinstance(quantity, bool):
+            raise ValueError(f"Cantidad inválida para producto {item.get('productId')}")
+    validate_items(items)
+
+    customer = order_input.get('customer') or {}
+    if not isinstance(customer, dict):
+        raise ValueError("customer debe ser un objeto")
+
+    return {
+        'orderId': build_order_id(tenant_id, external_id),
+        'externalId': external_id,
+        'items': items,
+        'notes': order_input.get('notes', ''),
+        'paymentMethod': order_input.get('paymentMethod', 'CASH'),
+        'deliveryAddress': order_input.get('deliveryAddress', ''),
+        'userInfo': {field: customer.get(field, '') for field in CUSTOMER_FIELDS}
+    }
+
+
+def build_order_id(tenant_id, external_id):
+    """
+    orderId determinístico por externalId (uuid4 si la orden no trae uno)
+    """
+    if not external_id:
+        return str(uuid.uuid4())
+    return str(uuid.uuid5(EXTERNAL_ORDER_ID_NAMESPACE, f"{tenant_id}#{external_id}"))
+
+
+def build_order(order_input, products, tenant_id, user_id, current_time):
+    """
+    Item de la tabla de órdenes para una orden del lote
+    """
+    enriched_items, total = enrich_items(order_input['items'], products, tenant_id)
+    order = build_order_record(order_input['orderId'], {
+        'tenantId': tenant_id,
+        'userId': user_id,
+        'userInfo': order_input['userInfo'],
+        'items': enriched_items,
+        'notes': order_input['notes'],
+        'paymentMethod': order_input['paymentMethod'],
+        'deliveryAddress': order_input['deliveryAddress'],
+        'total': total,
+        'estimatedPreparationTime': max(item['preparationTimeMinutes'] for item in enriched_items)
+    }, current_time)
+    if order_input['externalId']:
+        order['externalId'] = order_input['externalId']
+    return order
+
+
+def fetch_products(product_ids):
+    """
+    Retorna {productId: producto} de los productos del lote con una sola
+    lectura BatchGetItem (bloques de 100)
+    """
+    if not product_ids:
+        return {}
+
+    items, unprocessed = batch_get_items(
+        dynamodb.meta.client,
+        products_table.name,
+        [{'productId': product_id} for product_id in product_ids],
+        projection='productId, tenantId, #name, price, isAvailable, available, '
+                   'preparationTimeMinutes, preparationTime',
+        expression_names={'#name': 'name'}
+    )
+    if unprocessed:
+        raise RuntimeError(f"{len(unprocessed)} productos sin leer por throttling")
+
+    products = {}
+    for item in items:
+        static, is_available = normalize_product(item, PRODUCT_FIELDS)
+        products[item['productId']] = dict(static, isAvailable=is_available)
+
+    print(f"[CreateOrdersBatch] {len(products)} de {len(product_ids)} productos leídos con BatchGetItem")
+    return products
+
+
+def find_existing_orders(order_ids):
+    """
+    Retorna el set de orderIds que ya existen en la tabla
+    """
+    if not order_ids:
+        return set()
+
+    items, unprocessed = batch_get_items(
+        dynamodb.meta.client,
+        orders_table.name,
+        [{'orderId': order_id} for order_id in order_ids],
+        projection='orderId'
+    )
+    if unprocessed:
+        raise RuntimeError(f"{len(unprocessed)} órdenes sin verificar por throttling")
+    return {item['orderId'] for item in items}
+
+
+def write_orders(orders):
+    """
+    Persiste las órdenes del lote. Las que traen externalId se escriben con
+    Put condicional (attribute_not_exists), así un reenvío concurrente del
+    mismo lote no sobrescribe la orden ni responde CREATED dos veces; las
+    demás tienen orderId aleatorio y van por BatchWriteItem.
+
+    Returns:
+        (set de orderIds que ya existían, {orderId: mensaje de error})
+    """
+    external = [order for order in orders if order.get('externalId')]
+    plain = [order for order in orders if not order.get('externalId')]
+
+    failed_writes = {
+        item['orderId']: error
+        for item, error in batch_write_items(dynamodb.meta.client, orders_table.name, plain, parallel=True)
+    }
+
+    duplicated = set()
+    actions = [
+        {
+            'Put': {
+                'TableName': orders_table.name,
+                'Item': order,
+                'ConditionExpression': 'attribute_not_exists(orderId)'
+            }
+        }
+        for order in external
+    ]
+    for action, reason in transact_write_actions(dynamodb.meta.client, actions):
+        order_id = action['Put']['Item']['orderId']
+        if reason.get('Code') == 'ConditionalCheckFailed':
+            duplicated.add(order_id)
+        else:
+            failed_writes[order_id] = reason.get('Message') or reason.get('Code')
+
+    return duplicated, failed_writes
+
+
+def build_result(index, order_input, status, order_id=None, total=None, message=None):
+    """
+    Resultado de una orden del lote
+    """
+    result = {'index': index, 'status': status}
+    if isinstance(order_input, dict) and order_input.get('externalId') is not None:
+        result['externalId'] = order_input['externalId']
+    if order_id:
+        result['orderId'] = order_id
+    if total is not None:
+        result['total'] = float(total)
+    if message:
+        result['message'] = message
+    return result
+
+
+def build_response(status_code, body):
+    """
+    Construye una respuesta HTTP estandarizada
+    """
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+            'Access-Control-Allow-Methods': 'POST,OPTIONS'
+        },
+        'body': json.dumps(body, default=str)
+    }
@@ -3,6 +3,9 @@ Lambda: PersistAndBuildOrder
 Descripción: Persiste la orden en DynamoDB con toda la información preparada
 Entrada: Datos preparados por PrepareOrderData
 Salida: Orden creada con orderId generado
+
+Idempotente por requestId: el orderId se deriva del requestId y la escritura
+es condicional, así un reintento de Step Functions no duplica la orden.
 """
 
 import json
@@ -10,11 +13,25 @@ import os
 import boto3
 import uuid
 from datetime import datetime
-from decimal import Decimal
+import sys
+
+# Agregar shared al path para importar helpers
+sys.path.insert(0, '/opt/python')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../shared'))
+
+from orders.claim_check import load_payload, strip_payload
+from orders.order_builder import build_order_record
+from utils.idempotency import get_result, save_result
 
 dynamodb = boto3.resource('dynamodb')
+s3 = boto3.client('s3')
 orders_table = dynamodb.Table(os.environ['ORDERS_TABLE'])
 
+# Espacio de nombres para derivar orderId = uuid5(namespace, requestId)
+ORDER_ID_NAMESPACE = uuid.UUID('6f1c2a4e-8d3b-5e7f-9a0b-1c2d3e4f5a6b')
+
+STEP_NAME = 'PersistAndBuildOrder'
+
 
 def handler(event, context):
     """
@@ -23,52 +40,41 @@ def handler(event, context):
     try:
         print(f"[PersistAndBuildOrder] Evento recibido: {json.dumps(event, default=str)}")
         
-        # Generar orderId único
-        order_id = str(uuid.uuid4())
-        current_time = datetime.utcnow().isoformat() + 'Z'
+        # Si este paso ya se completó para el requestId (reintento), se
+        # retorna el resultado anterior sin volver a escribir
+        request_id = event.get('requestId')
+        idempotency_key = f"{request_id}#{STEP_NAME}" if request_id else None
+        if idempotency_key:
+            previous = get_result(idempotency_key)
+            if previous is not None:
+                print(f"[PersistAndBuildOrder] Paso ya completado para {request_id}, orden {previous['orderId']}")
+                return previous
         
-        # Asegurar que todos los números son Decimal para DynamoDB
-        items = []
-        for item in event['items']:
-            items.append({
-                'productId': item['productId'],
-                'name': item['name'],
-                'quantity': item['quantity'],
-                'unitPrice': Decimal(str(item['unitPrice'])),
-                'subtotal': Decimal(str(item['subtotal'])),
-                'preparationTimeMinutes': Decimal(str(item['preparationTimeMinutes']))
-            })
+        state = event
+        # items y userInfo pueden venir por referencia (claim-check)
+        event = load_payload(state, s3)
         
-        # Construir objeto de orden
-        order = {
-            'orderId': order_id,
-            'tenantId': event['tenantId'],
-            'userId': event['userId'],
-            'userInfo': event.get('userInfo', {}),
-            'status': 'CREATED',
-            'items': items,
-            'notes': event.get('notes', ''),
-            'paymentMethod': event.get('paymentMethod', 'CASH'),
-            'deliveryAddress': event.get('deliveryAddress', ''),
-            'total': Decimal(str(event['total'])),
-            'estimatedPreparationTime': Decimal(str(event.get('estimatedPreparationTime', 15))),
-            'createdAt': current_time,
-            'updatedAt': current_time,
-            'timeline': {
-                'CREATED': current_time
-            },
-            'cookId': None,
-            'dispatcherId': None,
-            'resolvedAt': None
-        }
+        # orderId determinístico por requestId
+        order_id = build_order_id(request_id)
+        current_time = datetime.utcnow().isoformat() + 'Z'
         
-        # Guardar en DynamoDB
-        orders_table.put_item(Item=order)
+        # Construir objeto de orden (números como Decimal para DynamoDB)
+        order = build_order_record(order_id, event, current_time)
         
-        print(f"[PersistAndBuildOrder] Orden {order_id} persistida exitosamente")
+        # Guardar en DynamoDB sin sobrescribir una orden ya creada por un intento anterior
+        try:
+            orders_table.put_item(
+                Item=order,
+                ConditionExpression='attribute_not_exists(orderId)'
+            )
+            print(f"[PersistAndBuildOrder] Orden {order_id} persistida exitosamente")
+        except orders_table.meta.client.exceptions.ConditionalCheckFailedException:
+            # Un intento anterior escribió la orden pero no llegó a guardar su resultado
+            order = orders_table.get_item(Key={'orderId': order_id}, ConsistentRead=True)['Item']
+            print(f"[PersistAndBuildOrder] Orden {order_id} ya existía, se reutiliza")
         
-        # Retornar orden creada con todos los datos
-        return {
+        # Retornar orden creada con todos los datos (por referencia si es grande)
+        output = strip_payload({
             'orderId': order_id,
             'tenantId': order['tenantId'],
             'userId': order['userId'],
@@ -80,9 +86,23 @@ def handler(event, context):
             'total': order['total'],
             'estimatedPreparationTime': order['estimatedPreparationTime'],
             'createdAt': order['createdAt'],
-            'requestId': event.get('requestId')
-        }
+            'requestId': request_id
+        }, state)
+        
+        if idempotency_key:
+            save_result(idempotency_key, output)
+        
+        return output
         
     except Exception as e:
         print(f"[PersistAndBuildOrder] Error al persistir orden: {str(e)}")
         raise Exception(f"PERSIST_ERROR: {str(e)}")
+
+
+def build_order_id(request_id):
+    """
+    orderId determinístico para un requestId (uuid4 si no hay requestId)
+    """
+    if not request_id:
+        return str(uuid.uuid4())
+    return str(uuid.uuid5(ORDER_ID_NAMESPACE, request_id))
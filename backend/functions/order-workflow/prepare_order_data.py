@@ -1,20 +1,62 @@
 """
 Lambda: PrepareOrderData
 Descripción: Valida y prepara los datos de la orden antes de persistir
-Entrada: requestId, tenantId, userId, items, notes, paymentMethod
+Entrada: requestId, tenantId, userId, items, notes, paymentMethod,
+         userProfile (opcional, claims de perfil del token)
 Salida: Datos validados y enriquecidos con información de productos
 """
 
 import json
 import os
+import time
 import boto3
 from datetime import datetime
-from decimal import Decimal
+import sys
+
+# Agregar shared al path para importar helpers
+sys.path.insert(0, '/opt/python')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../shared'))
+
+from menu.menu_version import get_menu_version
+from orders.claim_check import offload_payload
+from orders.order_builder import validate_items, enrich_items, normalize_product
+from utils.dynamo_batch import batch_get_items
+from utils.ttl_cache import TTLCache
 
 dynamodb = boto3.resource('dynamodb')
+s3 = boto3.client('s3')
+s3_bucket = os.environ.get('S3_BUCKET', 'fridays-images')
 products_table = dynamodb.Table(os.environ['PRODUCTS_TABLE'])
 users_table = dynamodb.Table(os.environ['USERS_TABLE'])
 
+# Cache de lectura entre invocaciones warm. Las claves de productos incluyen
+# la versión del menú del tenant: un cambio de precio o disponibilidad sube
+# la versión y se ve, como máximo, tras MENU_VERSION_CHECK_SECONDS.
+# Los TTL son el límite adicional si la versión no se pudo actualizar.
+# Clave de productos: (tenantId, productId, versión del menú)
+product_cache = TTLCache(
+    max_entries=int(os.environ.get('PRODUCT_CACHE_MAX_ENTRIES', '512')),
+    ttl_seconds=float(os.environ.get('PRODUCT_CACHE_TTL_SECONDS', '300')),
+    name='products'
+)
+availability_cache = TTLCache(
+    max_entries=int(os.environ.get('PRODUCT_CACHE_MAX_ENTRIES', '512')),
+    ttl_seconds=float(os.environ.get('AVAILABILITY_CACHE_TTL_SECONDS', '15')),
+    name='availability'
+)
+user_cache = TTLCache(
+    max_entries=int(os.environ.get('USER_CACHE_MAX_ENTRIES', '256')),
+    ttl_seconds=float(os.environ.get('USER_CACHE_TTL_SECONDS', '300')),
+    name='users'
+)
+
+# Atributos estables del producto (cacheados con el TTL largo)
+PRODUCT_STATIC_FIELDS = ['productId', 'tenantId', 'name', 'price', 'preparationTimeMinutes', 'preparationTime']
+USER_FIELDS = ['userId', 'firstName', 'lastName', 'email', 'phoneNumber', 'address', 'profileVersion']
+
+# Antigüedad máxima de los claims de perfil del token antes de releer el usuario
+PROFILE_CLAIMS_MAX_AGE_SECONDS = int(os.environ.get('PROFILE_CLAIMS_MAX_AGE_SECONDS', str(24 * 60 * 60)))
+
 
 def handler(event, context):
     """
@@ -31,6 +73,7 @@ def handler(event, context):
         notes = event.get('notes', '')
         payment_method = event.get('paymentMethod', 'CASH')
         delivery_address = event.get('deliveryAddress', '')
+        user_profile = event.get('userProfile')
         
         # Validaciones básicas
         if not tenant_id:
@@ -39,67 +82,24 @@ def handler(event, context):
         if not user_id:
             raise ValueError("userId es requerido")
         
-        if not items or len(items) == 0:
-            raise ValueError("La orden debe contener al menos un item")
-        
         # Validar que el usuario existe
         try:
-            user_response = users_table.get_item(Key={'userId': user_id})
-            if 'Item' not in user_response:
+            user = get_user(user_id, user_profile)
+            if user is None:
                 raise ValueError(f"Usuario {user_id} no encontrado")
-            user = user_response['Item']
         except Exception as e:
             print(f"[PrepareOrderData] Error al obtener usuario: {str(e)}")
             raise ValueError(f"Error al validar usuario: {str(e)}")
         
-        # Enriquecer items con información de productos
-        enriched_items = []
-        total = Decimal('0')
+        # Validar items antes de leer productos
+        validate_items(items)
         
-        for item in items:
-            product_id = item.get('productId')
-            quantity = item.get('quantity', 1)
-            
-            if not product_id:
-                raise ValueError("Cada item debe tener un productId")
-            
-            if quantity <= 0:
-                raise ValueError(f"Cantidad inválida para producto {product_id}")
-            
-            # Obtener información del producto
-            try:
-                product_response = products_table.get_item(Key={'productId': product_id})
-                if 'Item' not in product_response:
-                    raise ValueError(f"Producto {product_id} no encontrado")
-                
-                product = product_response['Item']
-                
-                # Validar disponibilidad
-                if not product.get('available', False):
-                    raise ValueError(f"Producto {product.get('name', product_id)} no está disponible")
-                
-                # Validar que el producto pertenece al tenant
-                if product.get('tenantId') != tenant_id:
-                    raise ValueError(f"Producto {product_id} no pertenece a la sede {tenant_id}")
-                
-                # Enriquecer item
-                unit_price = Decimal(str(product['price']))
-                item_total = unit_price * Decimal(str(quantity))
-                
-                enriched_items.append({
-                    'productId': product_id,
-                    'name': product.get('name', 'Unknown'),
-                    'quantity': quantity,
-                    'unitPrice': unit_price,  # Mantener como Decimal
-                    'subtotal': item_total,    # Mantener como Decimal
-                    'preparationTimeMinutes': product.get('preparationTime', 15)
-                })
-                
-                total += item_total
-                
-            except Exception as e:
-                print(f"[PrepareOrderData] Error al procesar producto {product_id}: {str(e)}")
-                raise ValueError(f"Error al validar producto {product_id}: {str(e)}")
+        # Leer los productos de la orden: desde el cache del contenedor y, los
+        # que falten, con BatchGetItem (una ida a DynamoDB por cada 100)
+        products = get_products(tenant_id, [item['productId'] for item in items])
+        
+        # Enriquecer items con información de productos
+        enriched_items, total = enrich_items(items, products, tenant_id)
         
         # Preparar datos de salida
         prepared_data = {
@@ -124,7 +124,8 @@ def handler(event, context):
         
         print(f"[PrepareOrderData] Datos preparados exitosamente: {json.dumps(prepared_data, default=str)}")
         
-        return prepared_data
+        # Órdenes grandes: items y userInfo viajan por referencia (claim-check)
+        return offload_payload(prepared_data, s3, s3_bucket, request_id)
         
     except ValueError as e:
         print(f"[PrepareOrderData] Error de validación: {str(e)}")
@@ -133,3 +134,111 @@ def handler(event, context):
     except Exception as e:
         print(f"[PrepareOrderData] Error inesperado: {str(e)}")
         raise Exception(f"INTERNAL_ERROR: {str(e)}")
+
+
+def get_products(tenant_id, product_ids):
+    """
+    Retorna {productId: producto} de los productos indicados (los que
+    existen), con isAvailable normalizado a bool. Usa el cache del
+    contenedor si la versión del menú del tenant no cambió.
+    """
+    try:
+        version = get_menu_version(tenant_id)
+    except Exception as e:
+        print(f"[PrepareOrderData] Error al leer versión del menú (se omite cache): {str(e)}")
+        version = None
+    
+    products = {}
+    missing = []
+    for product_id in set(product_ids):
+        cache_key = (tenant_id, product_id, version)
+        static = product_cache.get(cache_key) if version is not None else None
+        is_available = availability_cache.get(cache_key) if version is not None else None
+        if static is None or is_available is None:
+            missing.append(product_id)
+        else:
+            products[product_id] = dict(static, isAvailable=is_available)
+    
+    if missing:
+        for item in fetch_products(missing):
+            product_id = item['productId']
+            static, is_available = normalize_product(item, PRODUCT_STATIC_FIELDS)
+            if version is not None:
+                product_cache.set((tenant_id, product_id, version), static)
+                availability_cache.set((tenant_id, product_id, version), is_available)
+            products[product_id] = dict(static, isAvailable=is_available)
+    
+    log_cache_stats(product_cache, availability_cache)
+    return products
+
+
+def fetch_products(product_ids):
+    """
+    Lee los productos indicados con BatchGetItem (sin duplicados, en bloques
+    de 100 y reintentando UnprocessedKeys)
+    """
+    items, unprocessed = batch_get_items(
+        dynamodb.meta.client,
+        products_table.name,
+        [{'productId': product_id} for product_id in product_ids],
+        projection='productId, tenantId, #name, price, isAvailable, available, '
+                   'preparationTimeMinutes, preparationTime',
+        expression_names={'#name': 'name'}
+    )
+    if unprocessed:
+        # Throttling persistente: sale como INTERNAL_ERROR (no de validación)
+        # y el Retry del estado vuelve a intentarlo
+        raise RuntimeError(f"{len(unprocessed)} productos sin leer por throttling")
+    
+    print(f"[PrepareOrderData] {len(items)} productos leídos con BatchGetItem "
+          f"({len(product_ids)} sin cache)")
+    return items
+
+
+def get_user(user_id, profile=None):
+    """
+    Retorna los datos del usuario que se copian a la orden, o None si no existe.
+    
+    Si la orden trae los claims de perfil del token y no están vencidos se
+    usan directamente, sin ninguna lectura; la tabla de usuarios solo se lee
+    sin claims o con claims vencidos.
+    """
+    if profile is not None and not is_profile_stale(profile):
+        return dict({field: profile.get(field, '') for field in USER_FIELDS if field != 'userId'}, userId=user_id)
+    
+    user = user_cache.get(user_id)
+    if user is None:
+        response = users_table.get_item(Key={'userId': user_id})
+        if 'Item' not in response:
+            return None
+        user = {field: response['Item'][field] for field in USER_FIELDS if field in response['Item']}
+        # Los usuarios del seed usan "phone" en lugar de "phoneNumber"
+        if 'phoneNumber' not in user and 'phone' in response['Item']:
+            user['phoneNumber'] = response['Item']['phone']
+        user_cache.set(user_id, user)
+    log_cache_stats(user_cache)
+    return user
+
+
+def is_profile_stale(profile):
+    """
+    Los claims están vencidos si el token se emitió hace más de
+    PROFILE_CLAIMS_MAX_AGE_SECONDS. Es la única ventana de desactualización:
+    quien edite el perfil en este stack debe reemitir el token (ver
+    tablasDynamoDB/dynamo_users.md)
+    """
+    if time.time() - profile.get('profileIssuedAt', 0) > PROFILE_CLAIMS_MAX_AGE_SECONDS:
+        print(f"[PrepareOrderData] Claims de perfil vencidos (v{profile.get('profileVersion')}), se lee el usuario")
+        return True
+    return False
+
+
+def log_cache_stats(*caches):
+    """
+    Registra los contadores de los caches del contenedor
+    """
+    summary = ', '.join(
+        f"{stats['name']}: hits={stats['hits']} misses={stats['misses']} hitRate={stats['hitRate']}"
+        for stats in (cache.stats() for cache in caches)
+    )
+    print(f"[PrepareOrderData] Cache {summary}")
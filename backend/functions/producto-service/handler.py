@@ -7,6 +7,8 @@ import json
 import os
 import boto3
 import uuid
+import hashlib
+import time
 from datetime import datetime
 from decimal import Decimal
 import sys
@@ -21,6 +23,22 @@ from auth.auth_context import (
     is_admin,
     AuthorizationError
 )
+from auth.jwt_utils import get_jwt_secret
+from menu.menu_refresh import (
+    AVAILABLE_INDEX,
+    MENU_VIEWS,
+    convert_decimals,
+    load_menu_products,
+    write_menu_snapshots,
+    write_search_index
+)
+from menu.menu_snapshot import read_document, read_snapshot, search_index_key
+from menu.menu_version import get_menu_version, bump_menu_version, UnknownTenantError
+from menu.product_images import ALLOWED_CONTENT_TYPES, build_upload_key
+from menu.search_index import MenuSearchIndex
+from utils.cursor import encode_cursor, decode_cursor, InvalidCursorError
+from utils.dynamo_batch import batch_get_items, batch_write_items, transact_write_actions
+from utils.ttl_cache import TTLCache
 
 dynamodb = boto3.resource('dynamodb')
 s3 = boto3.client('s3')
@@ -28,6 +46,45 @@ s3 = boto3.client('s3')
 products_table = dynamodb.Table(os.environ['PRODUCTS_TABLE'])
 s3_bucket = os.environ.get('S3_BUCKET', 'fridays-images')
 
+# Audiencias del menú: la pública solo lista productos disponibles
+MENU_AUDIENCE_PUBLIC = 'public'
+MENU_AUDIENCE_ADMIN = 'admin'
+
+# Atributos que se pueden pedir con ?fields= (las vistas con nombre de
+# ?view= están en menu_refresh.MENU_VIEWS)
+PRODUCT_FIELDS = {
+    'productId', 'tenantId', 'name', 'description', 'category', 'price', 'currency',
+    'isAvailable', 'preparationTimeMinutes', 'imageKey', 'imageUrl', 'imageVariants', 'tags',
+    'createdAt', 'updatedAt', 'createdBy', 'updatedBy'
+}
+DEFAULT_MENU_VIEW = 'full'
+
+# Cache del menú entre invocaciones warm.
+# Clave: (tenantId, audiencia, categoría, límite, página, proyección, versión del menú)
+menu_cache = TTLCache(
+    max_entries=int(os.environ.get('MENU_CACHE_MAX_ENTRIES', '256')),
+    ttl_seconds=float(os.environ.get('MENU_CACHE_TTL_SECONDS', '60')),
+    name='menu'
+)
+
+# Índices de búsqueda por tenant. Clave: (tenantId, versión del menú)
+search_index_cache = TTLCache(
+    max_entries=int(os.environ.get('SEARCH_INDEX_CACHE_MAX_ENTRIES', '32')),
+    ttl_seconds=float(os.environ.get('SEARCH_INDEX_CACHE_TTL_SECONDS', '900')),
+    name='search-index'
+)
+SEARCH_MAX_QUERY_LENGTH = 100
+
+# Máximo de productos por llamada a POST /menu/productos/batch
+BATCH_MAX_PRODUCTS = int(os.environ.get('BATCH_MAX_PRODUCTS', '500'))
+
+# Vigencia de las URLs prefirmadas para subir imágenes
+UPLOAD_URL_EXPIRES_SECONDS = int(os.environ.get('UPLOAD_URL_EXPIRES_SECONDS', '300'))
+
+# Cache HTTP de las respuestas del menú (navegador / CloudFront)
+MENU_MAX_AGE_SECONDS = int(os.environ.get('MENU_MAX_AGE_SECONDS', '30'))
+MENU_STALE_WHILE_REVALIDATE_SECONDS = int(os.environ.get('MENU_STALE_WHILE_REVALIDATE_SECONDS', '300'))
+
 
 def handler(event, context):
     """
@@ -51,11 +108,37 @@ def handler(event, context):
         if path == '/menu' and http_method == 'GET':
             tenant_id = auth.get('tenantId') if auth else None
             return list_products(event, tenant_id)
+        elif path == '/menu/admin' and http_method == 'GET':
+            # Vista de administración: incluye productos no disponibles
+            try:
+                require_role(auth, ['ADMIN'])
+            except AuthorizationError as e:
+                return build_response(403, {
+                    'message': str(e),
+                    'code': 'FORBIDDEN'
+                })
+            category = (event.get('queryStringParameters') or {}).get('category')
+            if category:
+                return list_products_by_category(event, auth.get('tenantId'), category, include_unavailable=True)
+            return list_products(event, auth.get('tenantId'), include_unavailable=True)
+        elif path == '/menu/search' and http_method == 'GET':
+            tenant_id = auth.get('tenantId') if auth else None
+            return search_products(event, tenant_id)
         elif path.startswith('/menu/') and http_method == 'GET':
             # GET /menu/{category}
             category = path.split('/')[-1]
             tenant_id = auth.get('tenantId') if auth else None
             return list_products_by_category(event, tenant_id, category)
+        elif path == '/menu/productos/batch' and http_method == 'POST':
+            # Solo ADMIN puede importar productos
+            try:
+                require_role(auth, ['ADMIN'])
+            except AuthorizationError as e:
+                return build_response(403, {
+                    'message': str(e),
+                    'code': 'FORBIDDEN'
+                })
+            return create_products_batch(event, auth['userId'], auth.get('tenantId'))
         elif path == '/menu/productos' and http_method == 'POST':
             # Solo ADMIN puede crear productos
             try:
@@ -66,8 +149,8 @@ def handler(event, context):
                     'code': 'FORBIDDEN'
                 })
             return create_product(event, auth['userId'], auth.get('tenantId'))
-        elif path.startswith('/menu/items/') and http_method == 'PUT':
-            # Solo ADMIN puede actualizar productos
+        elif path == '/menu/availability' and http_method == 'PUT':
+            # Solo ADMIN puede cambiar disponibilidad (lote / "86 list")
             try:
                 require_role(auth, ['ADMIN'])
             except AuthorizationError as e:
@@ -75,8 +158,7 @@ def handler(event, context):
                     'message': str(e),
                     'code': 'FORBIDDEN'
                 })
-            product_id = path.split('/')[-1]
-            return update_product(event, auth['userId'], product_id, auth.get('tenantId'))
+            return update_availability_batch(event, auth['userId'], auth.get('tenantId'))
         elif path.endswith('/availability') and http_method == 'PUT':
             # Solo ADMIN puede cambiar disponibilidad
             try:
@@ -88,6 +170,28 @@ def handler(event, context):
                 })
             product_id = path.split('/')[-2]
             return update_availability(event, auth['userId'], product_id, auth.get('tenantId'))
+        elif path.startswith('/menu/items/') and path.endswith('/image') and http_method == 'POST':
+            # Solo ADMIN puede subir imágenes de productos
+            try:
+                require_role(auth, ['ADMIN'])
+            except AuthorizationError as e:
+                return build_response(403, {
+                    'message': str(e),
+                    'code': 'FORBIDDEN'
+                })
+            product_id = path.split('/')[-2]
+            return create_image_upload(event, product_id, auth.get('tenantId'))
+        elif path.startswith('/menu/items/') and http_method == 'PUT':
+            # Solo ADMIN puede actualizar productos
+            try:
+                require_role(auth, ['ADMIN'])
+            except AuthorizationError as e:
+                return build_response(403, {
+                    'message': str(e),
+                    'code': 'FORBIDDEN'
+                })
+            product_id = path.split('/')[-1]
+            return update_product(event, auth['userId'], product_id, auth.get('tenantId'))
         else:
             return build_response(404, {
                 'message': 'Ruta no encontrada',
@@ -103,30 +207,76 @@ def handler(event, context):
         })
 
 
-def list_products(event, tenant_id=None):
+def list_products(event, tenant_id=None, include_unavailable=False):
     """
-    Lista productos con paginación
-    GET /menu?limit=20&lastKey=PRODUCT#001
+    Lista productos con paginación por cursor opaco
+    GET /menu?limit=20&lastKey=<cursor>
+    
+    GET /menu?tenantId=<id> sin limit ni lastKey retorna el menú completo
+    desde el snapshot materializado del tenant.
+    
+    ?view=compact|full o ?fields=name,price limitan los atributos devueltos
+    (ProjectionExpression); productId siempre se incluye.
+    
+    El menú público solo lee productos disponibles (GSI disperso
+    availableTenantId-index); con include_unavailable (GET /menu/admin) se
+    lista todo el catálogo del tenant del administrador.
     """
     try:
         query_params = event.get('queryStringParameters') or {}
         limit = int(query_params.get('limit', 20))
         last_key = query_params.get('lastKey')
-        filter_tenant = query_params.get('tenantId', tenant_id)
+        filter_tenant = tenant_id if include_unavailable else query_params.get('tenantId', tenant_id)
+        audience = MENU_AUDIENCE_ADMIN if include_unavailable else MENU_AUDIENCE_PUBLIC
+        view, fields = parse_projection(query_params)
+        
+        # GET condicional: si el cliente ya tiene esta versión no se consulta DynamoDB.
+        # La vista de administración es privada: no se cachea en el navegador/CDN
+        etag = None if include_unavailable else build_menu_etag(event, filter_tenant)
+        if etag and etag_matches(event, etag):
+            return build_response(304, None, etag=etag)
+        
+        # Menú completo de un tenant: se sirve el snapshot materializado de la vista
+        if (filter_tenant and view and not include_unavailable
+                and not last_key and 'limit' not in query_params):
+            try:
+                return serve_menu_snapshot(filter_tenant, etag, view)
+            except Exception as e:
+                print(f"[ProductoService] Error al servir snapshot (se consulta DynamoDB): {str(e)}")
+        
+        cache_key = build_menu_cache_key(filter_tenant, audience, '*', limit, last_key, fields)
+        if cache_key:
+            cached = get_cached_menu(cache_key)
+            if cached is not None:
+                return build_response(200, cached, {'X-Cache': 'HIT'}, etag=etag)
         
         # Si no hay tenant específico, listar todos
         if filter_tenant:
-            response = products_table.query(
-                IndexName='tenantId-index',
-                KeyConditionExpression='tenantId = :tenantId',
-                ExpressionAttributeValues={':tenantId': filter_tenant},
-                Limit=limit
-            )
+            if include_unavailable:
+                index_name = 'tenantId-index'
+                key_condition = 'tenantId = :tenantId'
+            else:
+                index_name = AVAILABLE_INDEX
+                key_condition = 'availableTenantId = :tenantId'
+            cursor_scope = f"{index_name}#{filter_tenant}"
+            request_params = {
+                'IndexName': index_name,
+                'KeyConditionExpression': key_condition,
+                'ExpressionAttributeValues': {':tenantId': filter_tenant},
+                'Limit': limit
+            }
+            if last_key:
+                request_params['ExclusiveStartKey'] = decode_cursor(last_key, get_jwt_secret(), cursor_scope)
+            apply_projection(request_params, fields)
+            response = products_table.query(**request_params)
         else:
-            scan_params = {'Limit': limit}
+            # Scan del índice disperso: solo recorre productos disponibles
+            cursor_scope = f"{AVAILABLE_INDEX}#scan"
+            request_params = {'IndexName': AVAILABLE_INDEX, 'Limit': limit}
             if last_key:
-                scan_params['ExclusiveStartKey'] = {'productId': last_key}
-            response = products_table.scan(**scan_params)
+                request_params['ExclusiveStartKey'] = decode_cursor(last_key, get_jwt_secret(), cursor_scope)
+            apply_projection(request_params, fields)
+            response = products_table.scan(**request_params)
         
         items = response.get('Items', [])
         
@@ -139,10 +289,25 @@ def list_products(event, tenant_id=None):
         }
         
         if 'LastEvaluatedKey' in response:
-            result['lastKey'] = response['LastEvaluatedKey']['productId']
+            result['lastKey'] = encode_cursor(response['LastEvaluatedKey'], get_jwt_secret(), cursor_scope)
+        
+        if cache_key:
+            menu_cache.set(cache_key, result)
+            return build_response(200, result, {'X-Cache': 'MISS'}, etag=etag)
         
-        return build_response(200, result)
+        return build_response(200, result, etag=etag)
         
+    except InvalidProjectionError as e:
+        return build_response(400, {
+            'message': str(e),
+            'code': 'VALIDATION_ERROR'
+        })
+    except InvalidCursorError as e:
+        return build_response(400, {
+            'message': 'lastKey inválido',
+            'code': 'INVALID_CURSOR',
+            'details': str(e)
+        })
     except Exception as e:
         print(f"[ProductoService] Error en list_products: {str(e)}")
         return build_response(500, {
@@ -152,38 +317,100 @@ def list_products(event, tenant_id=None):
         })
 
 
-def list_products_by_category(event, tenant_id, category):
+def list_products_by_category(event, tenant_id, category, include_unavailable=False):
     """
-    Lista productos filtrados por categoría
-    GET /menu/{category}
+    Lista productos filtrados por categoría con paginación por cursor opaco
+    GET /menu/{category}?limit=20&lastKey=<cursor>
     """
     try:
         query_params = event.get('queryStringParameters') or {}
         limit = int(query_params.get('limit', 20))
-        filter_tenant = query_params.get('tenantId', tenant_id)
+        last_key = query_params.get('lastKey')
+        filter_tenant = tenant_id if include_unavailable else query_params.get('tenantId', tenant_id)
+        audience = MENU_AUDIENCE_ADMIN if include_unavailable else MENU_AUDIENCE_PUBLIC
+        _, fields = parse_projection(query_params)
         
-        # Scan con filtro de categoría
-        scan_params = {
-            'FilterExpression': 'category = :category',
-            'ExpressionAttributeValues': {':category': category.upper()},
-            'Limit': limit
-        }
+        # GET condicional: si el cliente ya tiene esta versión no se consulta DynamoDB
+        etag = None if include_unavailable else build_menu_etag(event, filter_tenant)
+        if etag and etag_matches(event, etag):
+            return build_response(304, None, etag=etag)
         
-        if filter_tenant:
-            scan_params['FilterExpression'] += ' AND tenantId = :tenantId'
-            scan_params['ExpressionAttributeValues'][':tenantId'] = filter_tenant
+        cache_key = build_menu_cache_key(filter_tenant, audience, category.upper(), limit, last_key, fields)
+        if cache_key:
+            cached = get_cached_menu(cache_key)
+            if cached is not None:
+                return build_response(200, cached, {'X-Cache': 'HIT'}, etag=etag)
         
-        response = products_table.scan(**scan_params)
+        if filter_tenant and include_unavailable:
+            # Query sobre el GSI tenantCategory-index: solo lee los productos de la categoría
+            tenant_category = build_tenant_category(filter_tenant, category)
+            cursor_scope = f"tenantCategory-index#{tenant_category}"
+            request_params = {
+                'IndexName': 'tenantCategory-index',
+                'KeyConditionExpression': 'tenantCategory = :tenantCategory',
+                'ExpressionAttributeValues': {':tenantCategory': tenant_category},
+                'Limit': limit
+            }
+            if last_key:
+                request_params['ExclusiveStartKey'] = decode_cursor(last_key, get_jwt_secret(), cursor_scope)
+            apply_projection(request_params, fields)
+            response = products_table.query(**request_params)
+        elif filter_tenant:
+            # Índice disperso con category como sort key: solo productos disponibles de la categoría
+            cursor_scope = f"{AVAILABLE_INDEX}#{build_tenant_category(filter_tenant, category)}"
+            request_params = {
+                'IndexName': AVAILABLE_INDEX,
+                'KeyConditionExpression': 'availableTenantId = :tenantId AND category = :category',
+                'ExpressionAttributeValues': {':tenantId': filter_tenant, ':category': category.upper()},
+                'Limit': limit
+            }
+            if last_key:
+                request_params['ExclusiveStartKey'] = decode_cursor(last_key, get_jwt_secret(), cursor_scope)
+            apply_projection(request_params, fields)
+            response = products_table.query(**request_params)
+        else:
+            # Sin tenant no hay partición que consultar: scan del índice disperso con filtro
+            cursor_scope = f"{AVAILABLE_INDEX}#scan#{category.upper()}"
+            request_params = {
+                'IndexName': AVAILABLE_INDEX,
+                'FilterExpression': 'category = :category',
+                'ExpressionAttributeValues': {':category': category.upper()},
+                'Limit': limit
+            }
+            if last_key:
+                request_params['ExclusiveStartKey'] = decode_cursor(last_key, get_jwt_secret(), cursor_scope)
+            apply_projection(request_params, fields)
+            response = products_table.scan(**request_params)
         
         items = response.get('Items', [])
         products = [convert_decimals(item) for item in items]
         
-        return build_response(200, {
+        result = {
             'category': category,
             'products': products,
             'count': len(products)
-        })
+        }
         
+        if 'LastEvaluatedKey' in response:
+            result['lastKey'] = encode_cursor(response['LastEvaluatedKey'], get_jwt_secret(), cursor_scope)
+        
+        if cache_key:
+            menu_cache.set(cache_key, result)
+            return build_response(200, result, {'X-Cache': 'MISS'}, etag=etag)
+        
+        return build_response(200, result, etag=etag)
+        
+    except InvalidProjectionError as e:
+        return build_response(400, {
+            'message': str(e),
+            'code': 'VALIDATION_ERROR'
+        })
+    except InvalidCursorError as e:
+        return build_response(400, {
+            'message': 'lastKey inválido',
+            'code': 'INVALID_CURSOR',
+            'details': str(e)
+        })
     except Exception as e:
         print(f"[ProductoService] Error en list_products_by_category: {str(e)}")
         return build_response(500, {
@@ -201,50 +428,24 @@ def create_product(event, user_id, tenant_id):
     try:
         body = json.loads(event.get('body', '{}'))
         
-        # Validaciones
-        name = body.get('name')
-        price = body.get('price')
-        category = body.get('category', 'FOOD')
-        
-        if not name or not price:
+        if not tenant_id:
             return build_response(400, {
-                'message': 'name y price son requeridos',
+                'message': 'tenantId es requerido',
                 'code': 'VALIDATION_ERROR'
             })
         
-        if not tenant_id:
+        try:
+            product = build_product_item(body, user_id, tenant_id)
+        except (ValueError, ArithmeticError) as e:
             return build_response(400, {
-                'message': 'tenantId es requerido',
+                'message': str(e),
                 'code': 'VALIDATION_ERROR'
             })
         
-        # Generar productId
-        product_id = str(uuid.uuid4())
-        current_time = datetime.utcnow().isoformat() + 'Z'
-        
-        # Crear producto
-        product = {
-            'productId': product_id,
-            'tenantId': tenant_id,
-            'name': name,
-            'description': body.get('description', ''),
-            'category': category.upper(),
-            'price': Decimal(str(price)),
-            'currency': body.get('currency', 'PEN'),
-            'isAvailable': body.get('isAvailable', True),
-            'preparationTimeMinutes': body.get('preparationTimeMinutes', 15),
-            'imageKey': body.get('imageKey', ''),
-            'imageUrl': body.get('imageUrl', ''),
-            'tags': body.get('tags', []),
-            'createdAt': current_time,
-            'updatedAt': current_time,
-            'createdBy': user_id,
-            'updatedBy': user_id
-        }
-        
         products_table.put_item(Item=product)
+        invalidate_menu(tenant_id, [product])
         
-        print(f"[ProductoService] Producto creado: {product_id}")
+        print(f"[ProductoService] Producto creado: {product['productId']}")
         
         return build_response(201, {
             'message': 'Producto creado exitosamente',
@@ -260,31 +461,134 @@ def create_product(event, user_id, tenant_id):
         })
 
 
-def update_product(event, user_id, product_id, tenant_id):
+def create_products_batch(event, user_id, tenant_id):
     """
-    Actualiza un producto existente (solo ADMIN)
-    PUT /menu/items/{itemId}
+    Crea muchos productos en una sola llamada (solo ADMIN)
+    POST /menu/productos/batch
+    Body: { "products": [...], "parallel": true }
+    
+    Los productos válidos se escriben con batch_write_item en bloques de 25;
+    la respuesta reporta el resultado de cada item en el orden recibido.
     """
     try:
         body = json.loads(event.get('body', '{}'))
+        products_data = body.get('products')
+        parallel = bool(body.get('parallel', False))
         
-        # Verificar que el producto existe
-        response = products_table.get_item(Key={'productId': product_id})
-        if 'Item' not in response:
-            return build_response(404, {
-                'message': 'Producto no encontrado',
-                'code': 'NOT_FOUND'
+        if not tenant_id:
+            return build_response(400, {
+                'message': 'tenantId es requerido',
+                'code': 'VALIDATION_ERROR'
             })
         
-        product = response['Item']
+        if not isinstance(products_data, list) or not products_data:
+            return build_response(400, {
+                'message': 'products es requerido y debe ser una lista no vacía',
+                'code': 'VALIDATION_ERROR'
+            })
         
-        # Validar que el producto pertenece al tenant
-        if product.get('tenantId') != tenant_id:
-            return build_response(403, {
-                'message': 'No tienes permisos para actualizar este producto',
-                'code': 'FORBIDDEN'
+        if len(products_data) > BATCH_MAX_PRODUCTS:
+            return build_response(400, {
+                'message': f'Máximo {BATCH_MAX_PRODUCTS} productos por lote',
+                'code': 'VALIDATION_ERROR'
             })
         
+        # Validar todos los items antes de escribir
+        results = []
+        products = []
+        current_time = datetime.utcnow().isoformat() + 'Z'
+        for index, data in enumerate(products_data):
+            try:
+                if not isinstance(data, dict):
+                    raise ValueError('Cada producto debe ser un objeto')
+                product = build_product_item(data, user_id, tenant_id, current_time)
+            except (ValueError, ArithmeticError) as e:
+                results.append({'index': index, 'status': 'INVALID', 'message': str(e)})
+                continue
+            products.append(product)
+            results.append({'index': index, 'productId': product['productId'], 'status': 'CREATED'})
+        
+        failed = batch_write_items(products_table.meta.client, products_table.name, products, parallel=parallel)
+        failed_errors = {item['productId']: error for item, error in failed}
+        for result in results:
+            if result.get('productId') in failed_errors:
+                result['status'] = 'FAILED'
+                result['message'] = failed_errors[result['productId']]
+        
+        created_count = len(products) - len(failed)
+        if created_count:
+            written = [product for product in products if product['productId'] not in failed_errors]
+            invalidate_menu(tenant_id, written)
+        
+        print(f"[ProductoService] Lote de productos: {created_count} creados, "
+              f"{len(products_data) - created_count} con error")
+        
+        return build_response(201 if created_count == len(products_data) else 207, {
+            'message': 'Lote de productos procesado',
+            'created': created_count,
+            'failed': len(products_data) - created_count,
+            'results': results
+        })
+        
+    except Exception as e:
+        print(f"[ProductoService] Error en create_products_batch: {str(e)}")
+        return build_response(500, {
+            'message': 'Error al crear productos',
+            'code': 'BATCH_CREATE_ERROR',
+            'details': str(e)
+        })
+
+
+def build_product_item(data, user_id, tenant_id, current_time=None):
+    """
+    Valida los datos de un producto y construye el item para DynamoDB.
+    Lanza ValueError si faltan campos requeridos.
+    """
+    name = data.get('name')
+    price = data.get('price')
+    category = data.get('category', 'FOOD')
+    
+    if not name or not price:
+        raise ValueError('name y price son requeridos')
+    
+    current_time = current_time or datetime.utcnow().isoformat() + 'Z'
+    is_available = data.get('isAvailable', True)
+    
+    product = {
+        'productId': str(uuid.uuid4()),
+        'tenantId': tenant_id,
+        'tenantCategory': build_tenant_category(tenant_id, category),
+        'name': name,
+        'description': data.get('description', ''),
+        'category': category.upper(),
+        'price': Decimal(str(price)),
+        'currency': data.get('currency', 'PEN'),
+        'isAvailable': is_available,
+        'preparationTimeMinutes': data.get('preparationTimeMinutes', 15),
+        'imageKey': data.get('imageKey', ''),
+        'imageUrl': data.get('imageUrl', ''),
+        'tags': data.get('tags', []),
+        'createdAt': current_time,
+        'updatedAt': current_time,
+        'createdBy': user_id,
+        'updatedBy': user_id
+    }
+    
+    # Clave del GSI disperso: solo los productos disponibles aparecen en el índice
+    if is_available:
+        product['availableTenantId'] = tenant_id
+    
+    return product
+
+
+def update_product(event, user_id, product_id, tenant_id):
+    """
+    Actualiza un producto existente (solo ADMIN)
+    PUT /menu/items/{itemId}
+    """
+    try:
+        body = json.loads(event.get('body', '{}'))
+        
         # Construir expresión de actualización
         update_expression = "SET #updatedAt = :updatedAt, #updatedBy = :updatedBy"
         expression_names = {
@@ -293,7 +597,8 @@ def update_product(event, user_id, product_id, tenant_id):
         }
         expression_values = {
             ':updatedAt': datetime.utcnow().isoformat() + 'Z',
-            ':updatedBy': user_id
+            ':updatedBy': user_id,
+            ':tenantId': tenant_id
         }
         
         # Campos actualizables
@@ -306,21 +611,37 @@ def update_product(event, user_id, product_id, tenant_id):
                 value = body[field]
                 if field == 'price':
                     value = Decimal(str(value))
+                if field == 'category':
+                    value = value.upper()
                 expression_values[f':{field}'] = value
         
-        # Actualizar en DynamoDB
-        products_table.update_item(
-            Key={'productId': product_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeNames=expression_names,
-            ExpressionAttributeValues=expression_values
-        )
+        # Mantener sincronizada la clave del GSI tenantCategory-index
+        if 'category' in body:
+            update_expression += ", #tenantCategory = :tenantCategory"
+            expression_names['#tenantCategory'] = 'tenantCategory'
+            expression_values[':tenantCategory'] = build_tenant_category(tenant_id, body['category'])
+        
+        # Actualizar en DynamoDB: la condición verifica existencia y pertenencia al tenant
+        try:
+            response = products_table.update_item(
+                Key={'productId': product_id},
+                UpdateExpression=update_expression,
+                ConditionExpression='attribute_exists(productId) AND tenantId = :tenantId',
+                ExpressionAttributeNames=expression_names,
+                ExpressionAttributeValues=expression_values,
+                ReturnValues='ALL_NEW',
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+        except products_table.meta.client.exceptions.ConditionalCheckFailedException as e:
+            return build_condition_failed_response(e)
+        invalidate_menu(tenant_id, [response['Attributes']])
         
         print(f"[ProductoService] Producto actualizado: {product_id}")
         
         return build_response(200, {
             'message': 'Producto actualizado exitosamente',
-            'productId': product_id
+            'productId': product_id,
+            'product': convert_decimals(response['Attributes'])
         })
         
     except Exception as e:
@@ -347,44 +668,243 @@ def update_availability(event, user_id, product_id, tenant_id):
                 'code': 'VALIDATION_ERROR'
             })
         
-        # Verificar que el producto existe
-        response = products_table.get_item(Key={'productId': product_id})
-        if 'Item' not in response:
+        # Actualizar disponibilidad: la condición verifica existencia y pertenencia al tenant
+        try:
+            response = products_table.update_item(
+                Key={'productId': product_id},
+                UpdateExpression=build_availability_update_expression(is_available),
+                ConditionExpression='attribute_exists(productId) AND tenantId = :tenantId',
+                ExpressionAttributeValues={
+                    ':isAvailable': is_available,
+                    ':updatedAt': datetime.utcnow().isoformat() + 'Z',
+                    ':updatedBy': user_id,
+                    ':tenantId': tenant_id
+                },
+                ReturnValues='ALL_NEW',
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+        except products_table.meta.client.exceptions.ConditionalCheckFailedException as e:
+            return build_condition_failed_response(e)
+        invalidate_menu(tenant_id, [response['Attributes']])
+        
+        print(f"[ProductoService] Disponibilidad actualizada: {product_id} -> {is_available}")
+        
+        return build_response(200, {
+            'message': 'Disponibilidad actualizada exitosamente',
+            'productId': product_id,
+            'isAvailable': is_available,
+            'product': convert_decimals(response['Attributes'])
+        })
+        
+    except Exception as e:
+        print(f"[ProductoService] Error en update_availability: {str(e)}")
+        return build_response(500, {
+            'message': 'Error al actualizar disponibilidad',
+            'code': 'UPDATE_AVAILABILITY_ERROR',
+            'details': str(e)
+        })
+
+
+def create_image_upload(event, product_id, tenant_id):
+    """
+    Entrega una URL prefirmada para subir la imagen de un producto directo a S3 (solo ADMIN)
+    POST /menu/items/{itemId}/image
+    Body: { "contentType": "image/jpeg" }
+    
+    La imagen se procesa al llegar al bucket (functions/image-processor), que
+    registra imageKey/imageUrl en el producto.
+    """
+    try:
+        body = json.loads(event.get('body') or '{}')
+        content_type = body.get('contentType')
+        
+        if content_type not in ALLOWED_CONTENT_TYPES:
+            return build_response(400, {
+                'message': f"contentType debe ser uno de: {', '.join(ALLOWED_CONTENT_TYPES)}",
+                'code': 'VALIDATION_ERROR'
+            })
+        
+        # Verificar que el producto existe y pertenece al tenant
+        response = products_table.get_item(
+            Key={'productId': product_id},
+            ProjectionExpression='tenantId'
+        )
+        product = response.get('Item')
+        if not product:
             return build_response(404, {
                 'message': 'Producto no encontrado',
                 'code': 'NOT_FOUND'
             })
-        
-        product = response['Item']
-        
-        # Validar que el producto pertenece al tenant
         if product.get('tenantId') != tenant_id:
             return build_response(403, {
                 'message': 'No tienes permisos para actualizar este producto',
                 'code': 'FORBIDDEN'
             })
         
-        # Actualizar disponibilidad
-        products_table.update_item(
-            Key={'productId': product_id},
-            UpdateExpression="SET isAvailable = :isAvailable, updatedAt = :updatedAt, updatedBy = :updatedBy",
-            ExpressionAttributeValues={
-                ':isAvailable': is_available,
-                ':updatedAt': datetime.utcnow().isoformat() + 'Z',
-                ':updatedBy': user_id
-            }
+        upload_key = build_upload_key(tenant_id, product_id, str(uuid.uuid4()), content_type)
+        upload_url = s3.generate_presigned_url(
+            'put_object',
+            Params={
+                'Bucket': s3_bucket,
+                'Key': upload_key,
+                'ContentType': content_type
+            },
+            ExpiresIn=UPLOAD_URL_EXPIRES_SECONDS
         )
         
-        print(f"[ProductoService] Disponibilidad actualizada: {product_id} -> {is_available}")
+        print(f"[ProductoService] URL de subida generada para {product_id}: {upload_key}")
         
-        return build_response(200, {
-            'message': 'Disponibilidad actualizada exitosamente',
-            'productId': product_id,
-            'isAvailable': is_available
+        return build_response(201, {
+            'uploadUrl': upload_url,
+            'method': 'PUT',
+            'headers': {'Content-Type': content_type},
+            'key': upload_key,
+            'expiresIn': UPLOAD_URL_EXPIRES_SECONDS
         })
         
     except Exception as e:
-        print(f"[ProductoService] Error en update_availability: {str(e)}")
+        print(f"[ProductoService] Error en create_image_upload: {str(e)}")
+        return build_response(500, {
+            'message': 'Error al generar URL de subida',
+            'code': 'UPLOAD_URL_ERROR',
+            'details': str(e)
+        })
+
+
+def build_availability_update_expression(is_available):
+    """
+    UpdateExpression de un cambio de disponibilidad. Mantiene la clave del
+    GSI disperso availableTenantId-index: se copia el tenantId (:tenantId)
+    al habilitar el producto y se elimina al deshabilitarlo.
+    """
+    expression = "SET isAvailable = :isAvailable, updatedAt = :updatedAt, updatedBy = :updatedBy"
+    if is_available:
+        return expression + ", availableTenantId = :tenantId"
+    return expression + " REMOVE availableTenantId"
+
+
+def build_condition_failed_response(error):
+    """
+    Traduce un ConditionalCheckFailedException de una escritura sobre un
+    producto: si DynamoDB devolvió el item, existe pero es de otro tenant (403);
+    si no, el producto no existe (404)
+    """
+    if error.response.get('Item'):
+        return build_response(403, {
+            'message': 'No tienes permisos para actualizar este producto',
+            'code': 'FORBIDDEN'
+        })
+    return build_response(404, {
+        'message': 'Producto no encontrado',
+        'code': 'NOT_FOUND'
+    })
+
+
+def update_availability_batch(event, user_id, tenant_id):
+    """
+    Cambia la disponibilidad de muchos productos a la vez (solo ADMIN)
+    PUT /menu/availability
+    Body: { "productIds": [...], "isAvailable": false }  o  { "tag": "pollo", "isAvailable": false }
+    
+    Las actualizaciones se aplican con TransactWriteItems (hasta 100 por
+    llamada) y la condición tenantId = :tenantId, así la verificación de
+    pertenencia no necesita lecturas previas.
+    """
+    try:
+        body = json.loads(event.get('body', '{}'))
+        is_available = body.get('isAvailable')
+        product_ids = body.get('productIds')
+        tag = body.get('tag')
+        
+        if not isinstance(is_available, bool):
+            return build_response(400, {
+                'message': 'isAvailable es requerido (true/false)',
+                'code': 'VALIDATION_ERROR'
+            })
+        
+        if not tenant_id:
+            return build_response(400, {
+                'message': 'tenantId es requerido',
+                'code': 'VALIDATION_ERROR'
+            })
+        
+        if product_ids is None and not tag:
+            return build_response(400, {
+                'message': 'Se requiere productIds o tag',
+                'code': 'VALIDATION_ERROR'
+            })
+        
+        if product_ids is None:
+            product_ids = query_product_ids_by_tag(tenant_id, tag)
+        elif not isinstance(product_ids, list) or not all(isinstance(pid, str) for pid in product_ids):
+            return build_response(400, {
+                'message': 'productIds debe ser una lista de strings',
+                'code': 'VALIDATION_ERROR'
+            })
+        
+        # Eliminar duplicados manteniendo el orden
+        product_ids = list(dict.fromkeys(product_ids))
+        
+        if len(product_ids) > BATCH_MAX_PRODUCTS:
+            return build_response(400, {
+                'message': f'Máximo {BATCH_MAX_PRODUCTS} productos por lote',
+                'code': 'VALIDATION_ERROR'
+            })
+        
+        current_time = datetime.utcnow().isoformat() + 'Z'
+        actions = [
+            {
+                'Update': {
+                    'TableName': products_table.name,
+                    'Key': {'productId': product_id},
+                    'UpdateExpression': build_availability_update_expression(is_available),
+                    'ConditionExpression': 'attribute_exists(productId) AND tenantId = :tenantId',
+                    'ExpressionAttributeValues': {
+                        ':isAvailable': is_available,
+                        ':updatedAt': current_time,
+                        ':updatedBy': user_id,
+                        ':tenantId': tenant_id
+                    },
+                    'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+                }
+            }
+            for product_id in product_ids
+        ]
+        
+        failures = transact_write_actions(products_table.meta.client, actions)
+        
+        failed_status = {}
+        for action, reason in failures:
+            product_id = action['Update']['Key']['productId']
+            if reason.get('Code') == 'ConditionalCheckFailed':
+                failed_status[product_id] = 'FORBIDDEN' if reason.get('Item') else 'NOT_FOUND'
+            else:
+                failed_status[product_id] = 'FAILED'
+        
+        results = [
+            {'productId': product_id, 'status': failed_status.get(product_id, 'UPDATED')}
+            for product_id in product_ids
+        ]
+        updated_count = len(product_ids) - len(failed_status)
+        
+        # Una sola invalidación del menú para todo el lote
+        if updated_count:
+            updated_ids = [product_id for product_id in product_ids if product_id not in failed_status]
+            invalidate_menu(tenant_id, read_written_availability(updated_ids, is_available))
+        
+        print(f"[ProductoService] Disponibilidad en lote -> {is_available}: "
+              f"{updated_count} actualizados, {len(failed_status)} con error")
+        
+        return build_response(200 if not failed_status else 207, {
+            'message': 'Disponibilidad actualizada',
+            'isAvailable': is_available,
+            'updated': updated_count,
+            'failed': len(failed_status),
+            'results': results
+        })
+        
+    except Exception as e:
+        print(f"[ProductoService] Error en update_availability_batch: {str(e)}")
         return build_response(500, {
             'message': 'Error al actualizar disponibilidad',
             'code': 'UPDATE_AVAILABILITY_ERROR',
@@ -392,31 +912,361 @@ def update_availability(event, user_id, product_id, tenant_id):
         })
 
 
-def convert_decimals(obj):
+def query_product_ids_by_tag(tenant_id, tag):
+    """
+    Retorna los productIds del tenant que tienen el tag indicado
+    """
+    product_ids = []
+    request_params = {
+        'IndexName': 'tenantId-index',
+        'KeyConditionExpression': 'tenantId = :tenantId',
+        'FilterExpression': 'contains(tags, :tag)',
+        'ProjectionExpression': 'productId',
+        'ExpressionAttributeValues': {':tenantId': tenant_id, ':tag': tag}
+    }
+    while True:
+        response = products_table.query(**request_params)
+        product_ids.extend(item['productId'] for item in response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return product_ids
+        request_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def serve_menu_snapshot(tenant_id, etag=None, view=DEFAULT_MENU_VIEW):
+    """
+    Responde con el snapshot del menú del tenant (en la vista pedida) ya
+    serializado. Si falta o está desactualizado, se regenera antes de responder.
+    Solo se regenera para sedes existentes: un tenantId desconocido responde 404.
+    """
+    version = get_menu_version(tenant_id, missing=None)
+    if version is None:
+        return build_tenant_not_found_response(tenant_id)
+    cache_key = (tenant_id, MENU_AUDIENCE_PUBLIC, '*', 'snapshot', None, view, version)
+    
+    body = get_cached_menu(cache_key)
+    cache_status = 'HIT'
+    if body is None:
+        cache_status = 'MISS'
+        body = read_snapshot(s3, s3_bucket, tenant_id, expected_version=version, view=view)
+        if body is None:
+            print(f"[ProductoService] Snapshot {view} de {tenant_id} v{version} no disponible, regenerando")
+            body = refresh_menu_snapshot(tenant_id, version)[view]
+        menu_cache.set(cache_key, body)
+    
+    return build_response(200, body, {'X-Cache': cache_status, 'X-Menu-Source': 'snapshot'}, etag=etag)
+
+
+def refresh_menu_snapshot(tenant_id, version, products=None):
+    """
+    Reescribe los snapshots del tenant, uno por vista (leyendo sus productos
+    si no se pasan). Retorna {vista: JSON del snapshot}.
+    """
+    if products is None:
+        products = load_menu_products(products_table, tenant_id)
+    return write_menu_snapshots(s3, s3_bucket, tenant_id, version, products)
+
+
+class InvalidProjectionError(ValueError):
+    """Excepción lanzada cuando ?fields= o ?view= no son válidos"""
+    pass
+
+
+def parse_projection(query_params):
+    """
+    Lee ?fields= o ?view= y retorna (vista, atributos).
+    Con ?fields= la vista es None; atributos None significa todos.
+    
+    Raises:
+        InvalidProjectionError: Si se pide un atributo o vista desconocidos
+    """
+    fields_param = query_params.get('fields')
+    if fields_param:
+        fields = {field.strip() for field in fields_param.split(',') if field.strip()}
+        unknown = fields - PRODUCT_FIELDS
+        if unknown:
+            raise InvalidProjectionError(f"Campos no válidos en fields: {', '.join(sorted(unknown))}")
+        fields.add('productId')
+        return None, sorted(fields)
+    
+    view = query_params.get('view', DEFAULT_MENU_VIEW)
+    if view not in MENU_VIEWS:
+        raise InvalidProjectionError(f"view debe ser uno de: {', '.join(MENU_VIEWS)}")
+    return view, MENU_VIEWS[view]
+
+
+def apply_projection(request_params, fields):
     """
-    Convierte objetos Decimal a float para serialización JSON
+    Agrega ProjectionExpression a una query/scan para leer solo `fields`.
+    Se usan nombres de atributo (#p0, #p1...) porque "name" es palabra reservada.
     """
-    if isinstance(obj, list):
-        return [convert_decimals(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: convert_decimals(value) for key, value in obj.items()}
-    elif isinstance(obj, Decimal):
-        return float(obj)
+    if not fields:
+        return
+    names = {f"#p{i}": field for i, field in enumerate(fields)}
+    request_params['ProjectionExpression'] = ', '.join(names)
+    request_params.setdefault('ExpressionAttributeNames', {}).update(names)
+
+
+def search_products(event, tenant_id=None):
+    """
+    Busca productos del tenant por nombre, tags y descripción
+    GET /menu/search?q=ham&tenantId=<id>&limit=20
+    """
+    try:
+        query_params = event.get('queryStringParameters') or {}
+        query = (query_params.get('q') or '').strip()
+        limit = int(query_params.get('limit', 20))
+        filter_tenant = query_params.get('tenantId', tenant_id)
+        
+        if not filter_tenant:
+            return build_response(400, {
+                'message': 'tenantId es requerido',
+                'code': 'VALIDATION_ERROR'
+            })
+        
+        if not query or len(query) > SEARCH_MAX_QUERY_LENGTH:
+            return build_response(400, {
+                'message': f'q es requerido (máximo {SEARCH_MAX_QUERY_LENGTH} caracteres)',
+                'code': 'VALIDATION_ERROR'
+            })
+        
+        # El índice solo se construye para sedes existentes
+        if get_menu_version(filter_tenant, missing=None) is None:
+            return build_tenant_not_found_response(filter_tenant)
+        
+        etag = build_menu_etag(event, filter_tenant)
+        if etag and etag_matches(event, etag):
+            return build_response(304, None, etag=etag)
+        
+        index = get_search_index(filter_tenant)
+        started_at = time.perf_counter()
+        products, truncated = index.search(query, limit=limit)
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+        
+        print(f"[ProductoService] Búsqueda '{query}' en {filter_tenant}: "
+              f"{len(products)} resultados en {elapsed_ms:.2f} ms"
+              f"{' (prefijo truncado)' if truncated else ''}")
+        
+        return build_response(200, {
+            'query': query,
+            'results': len(products),
+            'truncated': truncated,
+            'products': products
+        }, etag=etag)
+        
+    except Exception as e:
+        print(f"[ProductoService] Error en search_products: {str(e)}")
+        return build_response(500, {
+            'message': 'Error al buscar productos',
+            'code': 'SEARCH_ERROR',
+            'details': str(e)
+        })
+
+
+def get_search_index(tenant_id):
+    """
+    Retorna el índice de búsqueda vigente del tenant: primero desde memoria,
+    luego desde el índice persistido y, si no existe, construyéndolo desde
+    la tabla de productos
+    """
+    version = get_menu_version(tenant_id)
+    cache_key = (tenant_id, version)
+    
+    index = search_index_cache.get(cache_key)
+    if index is not None:
+        return index
+    
+    persisted = read_document(s3, s3_bucket, search_index_key(tenant_id), expected_version=version)
+    if persisted is not None:
+        index = MenuSearchIndex.from_dict(json.loads(persisted))
     else:
-        return obj
+        print(f"[ProductoService] Índice de búsqueda de {tenant_id} v{version} no disponible, construyendo")
+        products = load_menu_products(products_table, tenant_id)
+        index = refresh_search_index(tenant_id, version, products)
+    
+    search_index_cache.set(cache_key, index)
+    return index
 
 
-def build_response(status_code, body):
+def refresh_search_index(tenant_id, version, products):
     """
-    Construye una respuesta HTTP estandarizada
+    Reconstruye y persiste el índice de búsqueda del tenant
     """
+    index = write_search_index(s3, s3_bucket, tenant_id, version, products)
+    search_index_cache.set((tenant_id, version), index)
+    return index
+
+
+def build_tenant_category(tenant_id, category):
+    """
+    Clave de partición del GSI tenantCategory-index: "<tenantId>#<CATEGORY>"
+    """
+    return f"{tenant_id}#{category.upper()}"
+
+
+def build_menu_etag(event, tenant_id):
+    """
+    ETag fuerte de una respuesta del menú: depende de la versión del menú del
+    tenant, la ruta y los query params. Retorna None si no hay tenant o no se
+    pudo leer la versión.
+    """
+    if not tenant_id:
+        return None
+    try:
+        version = get_menu_version(tenant_id)
+    except Exception as e:
+        print(f"[ProductoService] Error al leer versión del menú (sin ETag): {str(e)}")
+        return None
+    query_params = event.get('queryStringParameters') or {}
+    canonical_query = '&'.join(f"{key}={value}" for key, value in sorted(query_params.items()))
+    fingerprint = f"{tenant_id}|{version}|{event.get('path', '')}|{canonical_query}"
+    return '"' + hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def etag_matches(event, etag):
+    """
+    Compara el header If-None-Match con el ETag actual (comparación débil,
+    como indica el RFC 9110 para If-None-Match)
+    """
+    if_none_match = get_header(event, 'If-None-Match')
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def get_header(event, name):
+    """
+    Lee un header sin distinguir mayúsculas/minúsculas
+    """
+    headers = event.get('headers') or {}
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def build_menu_cache_key(tenant_id, audience, category, limit, page, fields=None):
+    """
+    Construye la clave de cache de una página del menú.
+    Retorna None (sin cache) si no hay tenant o no se pudo leer la versión.
+    """
+    if not tenant_id:
+        return None
+    projection = tuple(fields) if fields else None
+    try:
+        return (tenant_id, audience, category, limit, page, projection, get_menu_version(tenant_id))
+    except Exception as e:
+        print(f"[ProductoService] Error al leer versión del menú (se omite cache): {str(e)}")
+        return None
+
+
+def get_cached_menu(cache_key):
+    """
+    Busca una página del menú en el cache y registra los contadores
+    """
+    cached = menu_cache.get(cache_key)
+    stats = menu_cache.stats()
+    print(f"[ProductoService] Menu cache {'HIT' if cached is not None else 'MISS'} "
+          f"(hits={stats['hits']}, misses={stats['misses']}, hitRate={stats['hitRate']})")
+    return cached
+
+
+def invalidate_menu(tenant_id, written=None):
+    """
+    Invalida el menú cacheado del tenant en este contenedor y sube la versión
+    del menú para que los demás contenedores lo detecten.
+    
+    `written` son los productos recién escritos (item completo): se aplican
+    sobre la lectura del GSI, que es eventualmente consistente y puede no
+    reflejar todavía la escritura.
+    """
+    removed = menu_cache.invalidate_matching(lambda key: key[0] == tenant_id)
+    search_index_cache.invalidate_matching(lambda key: key[0] == tenant_id)
+    try:
+        version = bump_menu_version(tenant_id)
+        print(f"[ProductoService] Menú de {tenant_id} invalidado ({removed} entradas), versión {version}")
+    except UnknownTenantError:
+        print(f"[ProductoService] La sede {tenant_id} no existe, no se regenera su menú")
+        return
+    except Exception as e:
+        print(f"[ProductoService] Error al actualizar versión del menú (no crítico): {str(e)}")
+        return
+    
+    # Regenerar el snapshot materializado y el índice de búsqueda con la nueva versión
+    try:
+        products = load_menu_products(products_table, tenant_id, written)
+        refresh_menu_snapshot(tenant_id, version, products)
+        refresh_search_index(tenant_id, version, products)
+    except Exception as e:
+        print(f"[ProductoService] Error al regenerar snapshot/índice del menú (no crítico): {str(e)}")
+
+
+def read_written_availability(product_ids, is_available):
+    """
+    Productos escritos por un cambio de disponibilidad en lote, para
+    invalidate_menu. Al deshabilitar basta el productId (se quitan
+    del menú); al habilitar se releen con lectura consistente.
+    """
+    if not is_available:
+        return [{'productId': product_id} for product_id in product_ids]
+    try:
+        items, unprocessed = batch_get_items(
+            products_table.meta.client,
+            products_table.name,
+            [{'productId': product_id} for product_id in product_ids],
+            consistent_read=True
+        )
+    except Exception as e:
+        print(f"[ProductoService] Error al releer productos para el snapshot (no crítico): {str(e)}")
+        return []
+    if unprocessed:
+        print(f"[ProductoService] {len(unprocessed)} productos sin releer para el snapshot")
+    return items
+
+
+def build_tenant_not_found_response(tenant_id):
+    """
+    404 para rutas públicas del menú con un tenantId que no existe en Sedes
+    """
+    return build_response(404, {
+        'message': 'Sede no encontrada',
+        'code': 'TENANT_NOT_FOUND',
+        'details': {'tenantId': tenant_id}
+    })
+
+
+def build_response(status_code, body, extra_headers=None, etag=None):
+    """
+    Construye una respuesta HTTP estandarizada.
+    Con `etag` agrega ETag y Cache-Control para que el navegador y CloudFront
+    puedan revalidar; un 304 se envía sin body. Un body que ya es texto
+    (snapshot pre-serializado) se envía tal cual.
+    """
+    headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type,Authorization,If-None-Match',
+        'Access-Control-Allow-Methods': 'GET,POST,PUT,OPTIONS'
+    }
+    if etag:
+        headers['ETag'] = etag
+        headers['Cache-Control'] = (
+            f"public, max-age={MENU_MAX_AGE_SECONDS}, "
+            f"stale-while-revalidate={MENU_STALE_WHILE_REVALIDATE_SECONDS}"
+        )
+        headers['Access-Control-Expose-Headers'] = 'ETag'
+    if extra_headers:
+        headers.update(extra_headers)
     return {
         'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-            'Access-Control-Allow-Methods': 'GET,POST,PUT,OPTIONS'
-        },
-        'body': json.dumps(body, default=str)
+        'headers': headers,
+        'body': '' if status_code == 304 else body if isinstance(body, str) else json.dumps(body, default=str)
     }
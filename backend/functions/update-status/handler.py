@@ -1,13 +1,31 @@
 """
 Lambda: UpdateStatus (applyStatus)
-Descripción: Actualiza el estado de una orden y publica evento ORDER_STATUS_CHANGED
-Endpoint: PUT /orders/{tenantId}/{orderId}/status
-Body: { "status": "COOKING", "notes": "Opcional" }
+Descripción: Actualiza el estado de una orden
+Endpoints:
+- PUT /orders/{tenantId}/{orderId}/status
+  Body: { "status": "COOKING", "notes": "Opcional", "expectedStatus": "CREATED" (opcional) }
+- PUT /orders/{tenantId}/status/batch
+  Body: { "updates": [ { "orderId": "...", "status": "READY", "expectedStatus": "COOKING", "notes": "..." } ] }
+
+El cambio es una sola escritura condicional (sin leer la orden antes): el
+timeline se actualiza por ruta (timeline.<estado>), así un cocinero y un
+despachador que cambian la misma orden a la vez no pisan sus entradas, y
+ReturnValues=ALL_OLD entrega el estado anterior. La condición de la
+escritura también exige una transición permitida (orders/order_status.py).
+
+El endpoint batch aplica cada cambio con la misma escritura condicional, en
+paralelo.
+
+El evento ORDER_STATUS_CHANGED no se publica aquí: lo publica
+orderEventsRelay desde el stream de la tabla (statusChangedBy y statusNotes
+viajan en la misma escritura).
 """
 
 import json
 import os
+import threading
 import boto3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import sys
 
@@ -21,28 +39,30 @@ from auth.auth_context import (
     validate_tenant_access,
     AuthorizationError
 )
+from orders.order_status import (
+    ORDER_STATUSES,
+    FINAL_STATUSES,
+    is_valid_status,
+    can_transition,
+    previous_statuses,
+    build_transition_condition
+)
 
 dynamodb = boto3.resource('dynamodb')
-eventbridge = boto3.client('events')
 
 orders_table = dynamodb.Table(os.environ['ORDERS_TABLE'])
-event_bus_name = os.environ.get('EVENT_BUS_NAME', 'default')
 
-# Estados válidos para el flujo de órdenes
-VALID_STATUSES = [
-    'CREATED',
-    'COOKING',
-    'READY',
-    'PACKAGED',
-    'ON_THE_WAY',
-    'DELIVERED',
-    'CANCELLED'
-]
+# Cambios de estado por lote: máximo por llamada y escrituras en paralelo.
+# El pool vive entre invocaciones warm para reutilizar las conexiones de cada hilo
+BATCH_MAX_UPDATES = int(os.environ.get('STATUS_BATCH_MAX_UPDATES', '100'))
+BATCH_MAX_WORKERS = int(os.environ.get('STATUS_BATCH_MAX_WORKERS', '10'))
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS)
+_thread_local = threading.local()
 
 
 def handler(event, context):
     """
-    Actualiza el estado de una orden y publica evento en EventBridge
+    Actualiza el estado de una orden
     """
     try:
         print(f"[UpdateStatus] Evento recibido: {json.dumps(event)}")
@@ -58,6 +78,9 @@ def handler(event, context):
                 'code': 'FORBIDDEN'
             })
         
+        if event.get('path', '').endswith('/status/batch'):
+            return update_status_batch(event, auth)
+        
         # Extraer path parameters
         path_params = event.get('pathParameters', {})
         tenant_id = path_params.get('tenantId')
@@ -67,6 +90,9 @@ def handler(event, context):
         body = json.loads(event.get('body', '{}'))
         new_status = body.get('status')
         notes = body.get('notes', '')
+        # Opcional: estado que el cliente cree que tiene la orden. Si otro
+        # usuario la cambió antes, responde 409 en lugar de pisar el cambio
+        expected_status = body.get('expectedStatus')
         
         # Usar el userId del contexto autenticado
         user_id = auth['userId']
@@ -84,95 +110,29 @@ def handler(event, context):
                 'code': 'VALIDATION_ERROR'
             })
         
-        if not new_status:
-            return build_response(400, {
-                'message': 'status es requerido en el body',
-                'code': 'VALIDATION_ERROR'
-            })
-        
-        if new_status not in VALID_STATUSES:
-            return build_response(400, {
-                'message': f'Estado inválido. Estados válidos: {", ".join(VALID_STATUSES)}',
-                'code': 'VALIDATION_ERROR'
-            })
+        # Estados desconocidos y transiciones imposibles: se rechazan sin I/O
+        status_error = check_status_change(new_status, expected_status)
+        if status_error:
+            return build_response(*status_error)
         
-        # Obtener orden actual
+        # Un staff solo puede cambiar órdenes de su sede (sin leer la orden)
         try:
-            response = orders_table.get_item(Key={'orderId': order_id})
-            if 'Item' not in response:
-                return build_response(404, {
-                    'message': f'Orden {order_id} no encontrada',
-                    'code': 'NOT_FOUND'
-                })
-            
-            order = response['Item']
-            
-            # Validar que la orden pertenece al tenant usando el helper
-            try:
-                validate_tenant_access(auth, order.get('tenantId'))
-            except AuthorizationError as e:
-                return build_response(403, {
-                    'message': str(e),
-                    'code': 'FORBIDDEN'
-                })
-            
-        except Exception as e:
-            print(f"[UpdateStatus] Error al obtener orden: {str(e)}")
-            return build_response(500, {
-                'message': 'Error al obtener orden',
-                'code': 'INTERNAL_ERROR',
-                'details': str(e)
+            validate_tenant_access(auth, tenant_id)
+        except AuthorizationError as e:
+            return build_response(403, {
+                'message': str(e),
+                'code': 'FORBIDDEN'
             })
         
-        # Guardar estado anterior
-        previous_status = order.get('status')
         current_time = datetime.utcnow().isoformat() + 'Z'
         
-        # Actualizar orden en DynamoDB
+        # Actualizar orden en DynamoDB: una sola escritura condicional que
+        # agrega la entrada del timeline y retorna la orden anterior
         try:
-            timeline = order.get('timeline', {})
-            timeline[new_status] = current_time
-            
-            update_expression = "SET #status = :status, #updatedAt = :updatedAt, #timeline = :timeline"
-            expression_attribute_names = {
-                '#status': 'status',
-                '#updatedAt': 'updatedAt',
-                '#timeline': 'timeline'
-            }
-            expression_attribute_values = {
-                ':status': new_status,
-                ':updatedAt': current_time,
-                ':timeline': timeline
-            }
-            
-            # Si el estado es DELIVERED o CANCELLED, marcar como resuelto
-            if new_status in ['DELIVERED', 'CANCELLED']:
-                update_expression += ", #resolvedAt = :resolvedAt"
-                expression_attribute_names['#resolvedAt'] = 'resolvedAt'
-                expression_attribute_values[':resolvedAt'] = current_time
-            
-            # Actualizar asignaciones según el rol
-            if user_id:
-                # Determinar si es cocinero o despachador basado en el estado
-                if new_status == 'COOKING' and not order.get('cookId'):
-                    update_expression += ", #cookId = :userId"
-                    expression_attribute_names['#cookId'] = 'cookId'
-                    expression_attribute_values[':userId'] = user_id
-                
-                if new_status in ['PACKAGED', 'ON_THE_WAY'] and not order.get('dispatcherId'):
-                    update_expression += ", #dispatcherId = :userId"
-                    expression_attribute_names['#dispatcherId'] = 'dispatcherId'
-                    expression_attribute_values[':userId'] = user_id
-            
-            orders_table.update_item(
-                Key={'orderId': order_id},
-                UpdateExpression=update_expression,
-                ExpressionAttributeNames=expression_attribute_names,
-                ExpressionAttributeValues=expression_attribute_values
-            )
-            
-            print(f"[UpdateStatus] Orden {order_id} actualizada: {previous_status} -> {new_status}")
-            
+            order = update_order_status(order_id, tenant_id, new_status, user_id, current_time, expected_status,
+                                        notes=notes)
+        except orders_table.meta.client.exceptions.ConditionalCheckFailedException as e:
+            return build_response(*describe_condition_failure(e, order_id, tenant_id, new_status, expected_status))
         except Exception as e:
             print(f"[UpdateStatus] Error al actualizar orden: {str(e)}")
             return build_response(500, {
@@ -181,41 +141,8 @@ def handler(event, context):
                 'details': str(e)
             })
         
-        # Publicar evento ORDER_STATUS_CHANGED en EventBridge
-        try:
-            event_detail = {
-                'orderId': order_id,
-                'tenantId': tenant_id,
-                'userId': order.get('userId'),
-                'previousStatus': previous_status,
-                'newStatus': new_status,
-                'changedBy': user_id,
-                'notes': notes,
-                'total': order.get('total'),
-                'items': order.get('items', []),
-                'userInfo': order.get('userInfo', {}),
-                'timestamp': current_time,
-                'eventType': 'ORDER_STATUS_CHANGED'
-            }
-            
-            eventbridge_response = eventbridge.put_events(
-                Entries=[
-                    {
-                        'Source': 'fridays.orders',
-                        'DetailType': 'ORDER_STATUS_CHANGED',
-                        'Detail': json.dumps(event_detail, default=str),
-                        'EventBusName': event_bus_name
-                    }
-                ]
-            )
-            
-            if eventbridge_response['FailedEntryCount'] > 0:
-                print(f"[UpdateStatus] Advertencia: Error al publicar evento: {eventbridge_response}")
-            else:
-                print(f"[UpdateStatus] Evento ORDER_STATUS_CHANGED publicado exitosamente")
-            
-        except Exception as e:
-            print(f"[UpdateStatus] Error al publicar evento (no crítico): {str(e)}")
+        previous_status = order.get('status')
+        print(f"[UpdateStatus] Orden {order_id} actualizada: {previous_status} -> {new_status}")
         
         # Retornar respuesta exitosa
         return build_response(200, {
@@ -235,6 +162,342 @@ def handler(event, context):
         })
 
 
+def update_order_status(order_id, tenant_id, new_status, user_id, current_time, expected_status=None,
+                        notes='', table=None):
+    """
+    Aplica el cambio de estado con update_item y retorna la orden anterior.
+    Lanza ConditionalCheckFailedException si la orden no existe, es de otro
+    tenant, su estado no es `expected_status` o no puede pasar a `new_status`.
+    """
+    table = table or orders_table
+    transition_condition, transition_values = build_transition_condition(new_status, expected_status)
+    update_expression = ("SET #status = :status, #updatedAt = :updatedAt, #timeline.#newStatus = :updatedAt, "
+                         "statusChangedBy = :changedBy, statusNotes = :notes")
+    condition_expression = f"attribute_exists(orderId) AND tenantId = :tenantId AND {transition_condition}"
+    expression_attribute_names = {
+        '#status': 'status',
+        '#updatedAt': 'updatedAt',
+        '#timeline': 'timeline',
+        '#newStatus': new_status
+    }
+    expression_attribute_values = dict(transition_values, **{
+        ':status': new_status,
+        ':updatedAt': current_time,
+        ':tenantId': tenant_id,
+        ':changedBy': user_id,
+        ':notes': notes
+    })
+    
+    # Si el estado es DELIVERED o CANCELLED, marcar como resuelto
+    if new_status in FINAL_STATUSES:
+        update_expression += ", #resolvedAt = :updatedAt"
+        expression_attribute_names['#resolvedAt'] = 'resolvedAt'
+    
+    # Asignar cocinero/despachador solo si la orden aún no tiene uno
+    assignee_field = get_assignee_field(new_status)
+    if user_id and assignee_field:
+        update_expression += f", #{assignee_field} = if_not_exists(#{assignee_field}, :userId)"
+        expression_attribute_names[f'#{assignee_field}'] = assignee_field
+        expression_attribute_values[':userId'] = user_id
+    
+    try:
+        response = table.update_item(
+            Key={'orderId': order_id},
+            UpdateExpression=update_expression,
+            ConditionExpression=condition_expression,
+            ExpressionAttributeNames=expression_attribute_names,
+            ExpressionAttributeValues=expression_attribute_values,
+            ReturnValues='ALL_OLD',
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )
+    except table.meta.client.exceptions.ClientError as e:
+        # Órdenes antiguas sin timeline, o con un timeline que no es un mapa:
+        # la ruta timeline.<estado> no es válida y se escribe un mapa nuevo
+        if e.response['Error']['Code'] != 'ValidationException' or 'document path' not in str(e):
+            raise
+        update_expression = update_expression.replace("#timeline.#newStatus = :updatedAt", "#timeline = :timeline")
+        del expression_attribute_names['#newStatus']
+        expression_attribute_values[':timeline'] = {new_status: current_time}
+        expression_attribute_values[':mapType'] = 'M'
+        timeline_condition = "attribute_not_exists(#timeline) OR NOT attribute_type(#timeline, :mapType)"
+        response = table.update_item(
+            Key={'orderId': order_id},
+            UpdateExpression=update_expression,
+            ConditionExpression=f"{condition_expression} AND ({timeline_condition})",
+            ExpressionAttributeNames=expression_attribute_names,
+            ExpressionAttributeValues=expression_attribute_values,
+            ReturnValues='ALL_OLD',
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )
+    
+    order = response['Attributes']
+    
+    # Órdenes creadas con cookId/dispatcherId = null: if_not_exists no los
+    # reemplaza, se asignan con una escritura condicional aparte
+    if user_id and assignee_field and assignee_field in order and order[assignee_field] is None:
+        try:
+            table.update_item(
+                Key={'orderId': order_id},
+                UpdateExpression=f"SET #{assignee_field} = :userId",
+                ConditionExpression=f"attribute_type(#{assignee_field}, :null)",
+                ExpressionAttributeNames={f'#{assignee_field}': assignee_field},
+                ExpressionAttributeValues={':userId': user_id, ':null': 'NULL'}
+            )
+        except table.meta.client.exceptions.ConditionalCheckFailedException:
+            pass
+    
+    return order
+
+
+def get_assignee_field(status):
+    """
+    Atributo de la orden que se asigna al usuario que la mueve a `status`
+    """
+    if status == 'COOKING':
+        return 'cookId'
+    if status in ['PACKAGED', 'ON_THE_WAY']:
+        return 'dispatcherId'
+    return None
+
+
+def check_status_change(new_status, expected_status=None):
+    """
+    Validación sin I/O de un cambio de estado. Retorna None si puede
+    aplicarse o (statusCode, body) con el motivo del rechazo.
+    """
+    if not new_status:
+        return 400, {
+            'message': 'status es requerido en el body',
+            'code': 'VALIDATION_ERROR'
+        }
+    
+    if not is_valid_status(new_status):
+        return 400, {
+            'message': f'Estado inválido. Estados válidos: {", ".join(ORDER_STATUSES)}',
+            'code': 'VALIDATION_ERROR'
+        }
+    
+    if expected_status is not None and not is_valid_status(expected_status):
+        return 400, {
+            'message': f'expectedStatus inválido. Estados válidos: {", ".join(ORDER_STATUSES)}',
+            'code': 'VALIDATION_ERROR'
+        }
+    
+    if not previous_statuses(new_status) or \
+            (expected_status is not None and not can_transition(expected_status, new_status)):
+        return 400, build_invalid_transition_body(expected_status, new_status)
+    
+    return None
+
+
+def describe_condition_failure(error, order_id, tenant_id, new_status, expected_status):
+    """
+    Traduce un ConditionalCheckFailedException del cambio de estado a
+    (statusCode, body) a partir de la orden que devolvió DynamoDB (ALL_OLD,
+    en formato de bajo nivel)
+    """
+    item = error.response.get('Item')
+    if not item:
+        return 404, {
+            'message': f'Orden {order_id} no encontrada',
+            'code': 'NOT_FOUND'
+        }
+    
+    if item.get('tenantId', {}).get('S') != tenant_id:
+        return 403, {
+            'message': f'La orden {order_id} no pertenece a la sede {tenant_id}',
+            'code': 'FORBIDDEN'
+        }
+    
+    current_status = item.get('status', {}).get('S')
+    if not can_transition(current_status, new_status):
+        return 409, build_invalid_transition_body(current_status, new_status)
+    
+    if expected_status is not None and current_status != expected_status:
+        return 409, {
+            'message': f'La orden está en {current_status}, se esperaba {expected_status}',
+            'code': 'STATUS_CONFLICT',
+            'details': {
+                'currentStatus': current_status,
+                'expectedStatus': expected_status,
+                'requestedStatus': new_status
+            }
+        }
+    
+    # El estado permitía el cambio: la orden se modificó a la vez (p.ej. otro
+    # cambio creó el timeline entre la escritura y su reintento)
+    return 409, {
+        'message': f'La orden {order_id} cambió durante la actualización, reintentar',
+        'code': 'CONCURRENT_UPDATE',
+        'details': {
+            'currentStatus': current_status,
+            'requestedStatus': new_status
+        }
+    }
+
+
+def build_invalid_transition_body(current_status, new_status):
+    """
+    Body de error para un cambio de estado no permitido por la máquina de estados
+    """
+    if current_status is None:
+        message = f'Ninguna orden puede pasar a {new_status}'
+    else:
+        message = f'Transición no permitida: {current_status} -> {new_status}'
+    return {
+        'message': message,
+        'code': 'INVALID_TRANSITION',
+        'details': {
+            'currentStatus': current_status,
+            'requestedStatus': new_status,
+            'allowedFrom': list(previous_statuses(new_status))
+        }
+    }
+
+
+def update_status_batch(event, auth):
+    """
+    Aplica muchos cambios de estado de una sede
+    PUT /orders/{tenantId}/status/batch
+    Body: { "updates": [ { "orderId", "status", "expectedStatus"?, "notes"? } ] }
+    
+    Cada cambio es la misma escritura condicional que el endpoint individual;
+    se ejecutan en paralelo. Responde el resultado de cada cambio, en el
+    orden recibido.
+    """
+    tenant_id = (event.get('pathParameters') or {}).get('tenantId')
+    user_id = auth['userId']
+    
+    if not tenant_id:
+        return build_response(400, {
+            'message': 'tenantId es requerido',
+            'code': 'VALIDATION_ERROR'
+        })
+    
+    try:
+        validate_tenant_access(auth, tenant_id)
+    except AuthorizationError as e:
+        return build_response(403, {
+            'message': str(e),
+            'code': 'FORBIDDEN'
+        })
+    
+    body = json.loads(event.get('body') or '{}')
+    updates = body.get('updates')
+    if not isinstance(updates, list) or not updates:
+        return build_response(400, {
+            'message': 'updates es requerido y no puede estar vacío',
+            'code': 'VALIDATION_ERROR'
+        })
+    
+    if len(updates) > BATCH_MAX_UPDATES:
+        return build_response(400, {
+            'message': f'Máximo {BATCH_MAX_UPDATES} cambios por lote',
+            'code': 'VALIDATION_ERROR',
+            'details': {'received': len(updates)}
+        })
+    
+    # Validación sin I/O de cada cambio
+    results = [None] * len(updates)
+    pending = []
+    seen = set()
+    for index, update in enumerate(updates):
+        if not isinstance(update, dict) or not update.get('orderId'):
+            results[index] = build_batch_result(index, update if isinstance(update, dict) else {}, error={
+                'message': 'orderId es requerido',
+                'code': 'VALIDATION_ERROR'
+            })
+            continue
+        
+        order_id = update['orderId']
+        status_error = check_status_change(update.get('status'), update.get('expectedStatus'))
+        if order_id in seen:
+            status_error = (400, {'message': f'Orden {order_id} repetida en el lote', 'code': 'VALIDATION_ERROR'})
+        if status_error:
+            results[index] = build_batch_result(index, update, error=status_error[1])
+            continue
+        
+        seen.add(order_id)
+        pending.append((index, update))
+    
+    # Escrituras condicionales en paralelo
+    current_time = datetime.utcnow().isoformat() + 'Z'
+    
+    def apply(entry):
+        index, update = entry
+        return index, update, apply_batch_update(update, tenant_id, user_id, current_time)
+    
+    for index, update, (order, error) in batch_executor.map(apply, pending):
+        if error:
+            results[index] = build_batch_result(index, update, error=error)
+        else:
+            results[index] = build_batch_result(index, update, previous_status=order.get('status'))
+    
+    summary = {}
+    for result in results:
+        summary[result['result']] = summary.get(result['result'], 0) + 1
+    print(f"[UpdateStatus] Lote de {len(updates)} cambios en {tenant_id}: {summary}")
+    
+    all_updated = summary.get('UPDATED', 0) == len(updates)
+    return build_response(200 if all_updated else 207, {
+        'message': 'Lote procesado',
+        'updatedAt': current_time,
+        'summary': summary,
+        'results': results
+    })
+
+
+def apply_batch_update(update, tenant_id, user_id, current_time):
+    """
+    Aplica un cambio del lote en el hilo actual. Retorna (orden anterior, None)
+    o (None, body de error)
+    """
+    table = get_thread_orders_table()
+    order_id = update['orderId']
+    new_status = update['status']
+    expected_status = update.get('expectedStatus')
+    try:
+        order = update_order_status(order_id, tenant_id, new_status, user_id, current_time,
+                                    expected_status, notes=update.get('notes', ''), table=table)
+        print(f"[UpdateStatus] Orden {order_id} actualizada: {order.get('status')} -> {new_status}")
+        return order, None
+    except table.meta.client.exceptions.ConditionalCheckFailedException as e:
+        return None, describe_condition_failure(e, order_id, tenant_id, new_status, expected_status)[1]
+    except Exception as e:
+        print(f"[UpdateStatus] Error al actualizar orden {order_id}: {str(e)}")
+        return None, {'message': str(e), 'code': 'UPDATE_ERROR'}
+
+
+def get_thread_orders_table():
+    """
+    Tabla de órdenes propia del hilo: los resources de boto3 no son seguros
+    entre hilos
+    """
+    if not hasattr(_thread_local, 'orders_table'):
+        session = boto3.session.Session()
+        _thread_local.orders_table = session.resource('dynamodb').Table(os.environ['ORDERS_TABLE'])
+    return _thread_local.orders_table
+
+
+def build_batch_result(index, update, previous_status=None, error=None):
+    """
+    Resultado de un cambio del lote
+    """
+    result = {
+        'index': index,
+        'orderId': update.get('orderId'),
+        'result': error['code'] if error else 'UPDATED',
+        'newStatus': update.get('status')
+    }
+    if previous_status is not None:
+        result['previousStatus'] = previous_status
+    if error:
+        result['message'] = error['message']
+        if 'details' in error:
+            result['details'] = error['details']
+    return result
+
+
 def build_response(status_code, body):
     """
     Construye una respuesta HTTP estandarizada
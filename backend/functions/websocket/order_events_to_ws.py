@@ -131,7 +131,7 @@ def build_message(event_type, detail):
             'tenantId': detail.get('tenantId'),
             'status': status,
             'total': detail.get('total'),
-            'items': detail.get('items', [])
+            'itemCount': detail.get('itemCount')
         }
     }
     
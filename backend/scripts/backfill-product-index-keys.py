@@ -0,0 +1,120 @@
+"""
+Backfill de las claves de GSI derivadas en la tabla de productos
+
+- tenantCategory ("<tenantId>#<CATEGORY>") para el GSI tenantCategory-index
+- availableTenantId (= tenantId, solo si el producto está disponible) para
+  el GSI disperso availableTenantId-index
+
+Los productos nuevos reciben estos atributos en create_product,
+update_product y update_availability; este script los completa una única
+vez en los productos creados antes de los índices.
+
+Requisitos:
+- AWS CLI configurado con credenciales
+- Stack desplegado con los GSIs tenantCategory-index y availableTenantId-index
+
+Uso:
+    python backfill-product-index-keys.py --stage dev --region us-east-1
+    python backfill-product-index-keys.py --stage dev --dry-run
+"""
+
+import boto3
+import argparse
+import sys
+
+# Configuración
+PRODUCTS_TABLE = "fridays-backend-products-{stage}"
+
+
+def backfill_products(table, dry_run=False):
+    """
+    Recorre la tabla y completa tenantCategory / availableTenantId donde
+    falten o estén desactualizados
+    """
+    scan_params = {
+        'ProjectionExpression': 'productId, tenantId, category, tenantCategory, '
+                                'isAvailable, available, availableTenantId'
+    }
+    scanned = updated = skipped = 0
+
+    while True:
+        response = table.scan(**scan_params)
+
+        for product in response.get('Items', []):
+            scanned += 1
+            tenant_id = product.get('tenantId')
+            category = product.get('category')
+
+            if not tenant_id or not category:
+                skipped += 1
+                print(f"  ⚠️  {product['productId']}: sin tenantId o category, se omite")
+                continue
+
+            expected = f"{tenant_id}#{category.upper()}"
+            # Productos antiguos (seed) usan "available" en lugar de "isAvailable"
+            is_available = bool(product.get('isAvailable', product.get('available', False)))
+            expected_available = tenant_id if is_available else None
+
+            if (product.get('tenantCategory') == expected
+                    and product.get('availableTenantId') == expected_available):
+                continue
+
+            update_expression = 'SET tenantCategory = :tenantCategory'
+            expression_values = {':tenantCategory': expected}
+            if expected_available:
+                update_expression += ', availableTenantId = :availableTenantId'
+                expression_values[':availableTenantId'] = expected_available
+            else:
+                update_expression += ' REMOVE availableTenantId'
+
+            if not dry_run:
+                table.update_item(
+                    Key={'productId': product['productId']},
+                    UpdateExpression=update_expression,
+                    ConditionExpression='attribute_exists(productId)',
+                    ExpressionAttributeValues=expression_values
+                )
+            updated += 1
+            print(f"  ✏️  {product['productId']} -> {expected} "
+                  f"({'disponible' if is_available else 'no disponible'})")
+
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    return scanned, updated, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill de claves de GSI en productos")
+    parser.add_argument("--stage", default="dev", help="Stage del deployment (dev, prod, etc)")
+    parser.add_argument("--region", default="us-east-1", help="Región de AWS")
+    parser.add_argument("--dry-run", action="store_true", help="Solo mostrar los cambios")
+
+    args = parser.parse_args()
+
+    table_name = PRODUCTS_TABLE.format(stage=args.stage)
+
+    print("=" * 80)
+    print("🔁 BACKFILL claves de GSI de productos - TGI FRIDAYS")
+    print("=" * 80)
+    print(f"Tabla: {table_name}")
+    print(f"Region: {args.region}")
+    print(f"Dry run: {args.dry_run}")
+    print("=" * 80)
+
+    try:
+        dynamodb = boto3.resource('dynamodb', region_name=args.region)
+        table = dynamodb.Table(table_name)
+
+        scanned, updated, skipped = backfill_products(table, args.dry_run)
+
+        print(f"\n✅ Productos revisados: {scanned}, actualizados: {updated}, omitidos: {skipped}\n")
+
+    except Exception as e:
+        print(f"\n❌ ERROR FATAL: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -282,6 +282,9 @@ def seed_products(dynamodb, table_name, tenant_id):
     category_count = {"FOOD": 0, "DRINK": 0, "DESSERT": 0, "COMBO": 0}
     for product in products:
         try:
+            product["tenantCategory"] = f"{product['tenantId']}#{product['category']}"
+            if product.get("isAvailable", product.get("available")):
+                product["availableTenantId"] = product["tenantId"]
             table.put_item(Item=product)
             category_count[product["category"]] += 1
             emoji = {"FOOD": "🍔", "DRINK": "🍹", "DESSERT": "🍰", "COMBO": "📦"}
@@ -90,6 +90,40 @@ def get_auth_context(event: Dict) -> Dict[str, str]:
         raise AuthorizationError(f"Error al extraer información de autenticación: {str(e)}")
 
 
+def get_profile_claims(event: Dict) -> Optional[Dict]:
+    """
+    Extrae los claims de perfil que el Lambda Authorizer copia del JWT.
+
+    API Gateway entrega los valores del context como texto, así que
+    profileVersion y profileIssuedAt se convierten a int.
+
+    Args:
+        event: El evento de API Gateway que contiene el contexto del authorizer
+
+    Returns:
+        Dict con firstName, lastName, email, phoneNumber, address,
+        profileVersion y profileIssuedAt (epoch), o None si el token se emitió
+        sin claims de perfil
+    """
+    authorizer = event.get('requestContext', {}).get('authorizer') or {}
+
+    if authorizer.get('profileVersion') in (None, ''):
+        return None
+
+    try:
+        return {
+            'firstName': authorizer.get('firstName', ''),
+            'lastName': authorizer.get('lastName', ''),
+            'email': authorizer.get('email', ''),
+            'phoneNumber': authorizer.get('phoneNumber', ''),
+            'address': authorizer.get('address', ''),
+            'profileVersion': int(authorizer['profileVersion']),
+            'profileIssuedAt': int(authorizer.get('profileIssuedAt') or 0)
+        }
+    except (TypeError, ValueError):
+        return None
+
+
 def require_role(auth_context: Dict, allowed_roles: List[str]) -> None:
     """
     Valida que el usuario autenticado tenga uno de los roles permitidos.
@@ -10,7 +10,7 @@ import os
 # Agregar shared al path para imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from shared.auth.jwt_utils import decode_token, extract_token_from_header
+from shared.auth.jwt_utils import decode_token, extract_token_from_header, PROFILE_FIELDS
 
 
 def handler(event, context):
@@ -50,12 +50,24 @@ def handler(event, context):
         base_arn = '/'.join(method_arn_parts[:2])  # arn:aws:.../stage
         wildcard_arn = f"{base_arn}/*/*"
         
-        policy = generate_policy(user_id, 'Allow', wildcard_arn, {
+        auth_context = {
             'userId': user_id,
             'email': email,
             'role': role,
             'tenantId': tenant_id or ''
-        })
+        }
+        
+        # Claims de perfil (solo en tokens emitidos con profileVersion). El
+        # context de API Gateway solo admite valores primitivos: los vacíos
+        # van como '' y cualquier otro tipo se serializa a texto
+        if 'profileVersion' in payload:
+            for field in PROFILE_FIELDS:
+                value = payload.get(field) or ''
+                auth_context[field] = value if isinstance(value, (str, int, float, bool)) else json.dumps(value)
+            auth_context['profileVersion'] = payload['profileVersion']
+            auth_context['profileIssuedAt'] = payload.get('iat', 0)
+        
+        policy = generate_policy(user_id, 'Allow', wildcard_arn, auth_context)
         
         return policy
         
@@ -11,6 +11,10 @@ from functools import lru_cache
 
 ssm = boto3.client('ssm')
 
+# Datos de perfil que viajan en el token para que la creación de órdenes no
+# tenga que leer la tabla de usuarios (ver prepare_order_data.get_user)
+PROFILE_FIELDS = ['firstName', 'lastName', 'phoneNumber', 'address']
+
 # Cache del secret para evitar múltiples llamadas a Parameter Store
 @lru_cache(maxsize=1)
 def get_jwt_secret():
@@ -26,9 +30,10 @@ def get_jwt_secret():
         raise Exception("No se pudo obtener el JWT secret")
 
 
-def generate_token(user_id, email, role, tenant_id=None):
+def generate_token(user_id, email, role, tenant_id=None, profile=None):
     """
-    Genera un token JWT para un usuario
+    Genera un token JWT para un usuario.
+    `profile` son los claims de perfil de build_profile_claims()
     """
     secret = get_jwt_secret()
     
@@ -41,10 +46,27 @@ def generate_token(user_id, email, role, tenant_id=None):
         'exp': datetime.utcnow() + timedelta(days=7)  # Token válido por 7 días
     }
     
+    if profile:
+        payload.update(profile)
+    
     token = jwt.encode(payload, secret, algorithm='HS256')
     return token
 
 
+def build_profile_claims(user):
+    """
+    Claims de perfil de un item de la tabla de usuarios, con su profileVersion
+    """
+    return {
+        'firstName': user.get('firstName', ''),
+        'lastName': user.get('lastName', ''),
+        # Los usuarios del seed usan "phone" en lugar de "phoneNumber"
+        'phoneNumber': user.get('phoneNumber', user.get('phone', '')),
+        'address': user.get('address', ''),
+        'profileVersion': int(user.get('profileVersion', 0))
+    }
+
+
 def decode_token(token):
     """
     Decodifica y valida un token JWT
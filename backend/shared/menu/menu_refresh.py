@@ -0,0 +1,124 @@
+"""
+Regeneración de los documentos derivados del menú de un tenant
+
+Tras cada cambio de productos se reescriben los snapshots por vista
+(menu_snapshot.py) y el índice de búsqueda (search_index.py) con la nueva
+versión del menú. Lo usan el servicio de productos y el procesador de
+imágenes, que también modifica productos.
+
+La lista de productos sale del GSI disperso availableTenantId-index, que es
+eventualmente consistente: los productos recién escritos (item completo, p.
+ej. ReturnValues='ALL_NEW') se aplican encima con merge_written_products para
+que el documento no quede con el estado anterior a la escritura.
+
+Uso:
+    from menu.menu_refresh import load_menu_products, write_menu_snapshots, write_search_index
+
+    products = load_menu_products(products_table, tenant_id, written=[item])
+    write_menu_snapshots(s3, bucket, tenant_id, version, products)
+    write_search_index(s3, bucket, tenant_id, version, products)
+"""
+
+import json
+from decimal import Decimal
+
+from menu.menu_snapshot import search_index_key, write_document, write_snapshot
+from menu.search_index import MenuSearchIndex
+
+# GSI disperso: solo contiene productos con isAvailable = true
+AVAILABLE_INDEX = 'availableTenantId-index'
+
+# Vistas con nombre del menú y sus atributos. La vista "full" (None)
+# retorna todos los atributos.
+MENU_VIEWS = {
+    'full': None,
+    'compact': ['productId', 'name', 'price', 'currency', 'imageUrl', 'category', 'isAvailable']
+}
+
+
+def query_tenant_products(products_table, tenant_id):
+    """
+    Retorna todos los productos disponibles del tenant recorriendo todas las
+    páginas del GSI disperso
+    """
+    items = []
+    request_params = {
+        'IndexName': AVAILABLE_INDEX,
+        'KeyConditionExpression': 'availableTenantId = :tenantId',
+        'ExpressionAttributeValues': {':tenantId': tenant_id}
+    }
+    while True:
+        response = products_table.query(**request_params)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        request_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def merge_written_products(products, written):
+    """
+    Aplica los productos recién escritos sobre la lectura del GSI disperso:
+    se agregan o reemplazan si siguen disponibles (tienen availableTenantId)
+    y se quitan si no. Mantiene el orden del índice (por categoría).
+    """
+    if not written:
+        return products
+    merged = {product['productId']: product for product in products}
+    for product in written:
+        if product.get('availableTenantId'):
+            merged[product['productId']] = product
+        else:
+            merged.pop(product['productId'], None)
+    return sorted(merged.values(), key=lambda product: product.get('category', ''))
+
+
+def load_menu_products(products_table, tenant_id, written=None):
+    """
+    Productos del menú del tenant listos para serializar: lectura del GSI,
+    con los productos recién escritos aplicados encima
+    """
+    products = merge_written_products(query_tenant_products(products_table, tenant_id), written or [])
+    return [convert_decimals(item) for item in products]
+
+
+def project_product(product, fields):
+    """
+    Proyección en memoria de un producto (para los snapshots por vista)
+    """
+    return {field: product[field] for field in fields if field in product}
+
+
+def write_menu_snapshots(s3_client, bucket, tenant_id, version, products):
+    """
+    Reescribe los snapshots del tenant, uno por vista.
+    Retorna {vista: JSON del snapshot}.
+    """
+    payloads = {}
+    for view, fields in MENU_VIEWS.items():
+        view_products = products if fields is None else [project_product(p, fields) for p in products]
+        payloads[view] = write_snapshot(s3_client, bucket, tenant_id, version, view_products, view=view)
+    return payloads
+
+
+def write_search_index(s3_client, bucket, tenant_id, version, products):
+    """
+    Reconstruye y persiste el índice de búsqueda del tenant
+    """
+    index = MenuSearchIndex.build(tenant_id, version, products)
+    write_document(s3_client, bucket, search_index_key(tenant_id),
+                   json.dumps(index.to_dict(), default=str), version)
+    return index
+
+
+def convert_decimals(obj):
+    """
+    Convierte objetos Decimal a float para serialización JSON
+    """
+    if isinstance(obj, list):
+        return [convert_decimals(item) for item in obj]
+    elif isinstance(obj, dict):
+        return {key: convert_decimals(value) for key, value in obj.items()}
+    elif isinstance(obj, Decimal):
+        return float(obj)
+    else:
+        return obj
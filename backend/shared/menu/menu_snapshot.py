@@ -0,0 +1,145 @@
+"""
+Snapshots materializados del menú por tenant
+
+Cada cambio de productos regenera un documento JSON del menú completo del
+tenant, ya serializado y comprimido con gzip, y lo guarda en S3 en
+menus/<tenantId>/menu.json.gz. GET /menu?tenantId= lo sirve tal cual, sin
+consultar DynamoDB ni convertir items.
+
+La versión del menú (ver menu_version.py) se guarda como metadata del
+objeto para que el lector pueda descartar un snapshot desactualizado sin
+descomprimirlo. Además del menú completo se guardan variantes proyectadas
+por vista (p. ej. menus/<tenantId>/menu-compact.json.gz). El índice de búsqueda del tenant (search_index.py) se
+persiste de la misma forma en menus/<tenantId>/search-index.json.gz.
+
+Si la variable MENU_SNAPSHOT_DIR está definida, los snapshots se escriben en
+ese directorio local en lugar de S3 (útil para pruebas sin AWS).
+"""
+
+import gzip
+import json
+import os
+from datetime import datetime
+
+SNAPSHOT_PREFIX = 'menus'
+SNAPSHOT_FILENAME = 'menu.json.gz'
+FULL_VIEW = 'full'
+SEARCH_INDEX_FILENAME = 'search-index.json.gz'
+
+
+def snapshot_key(tenant_id, view=FULL_VIEW):
+    """
+    Key del snapshot del tenant (y vista) dentro del bucket
+    """
+    if view == FULL_VIEW:
+        return f"{SNAPSHOT_PREFIX}/{tenant_id}/{SNAPSHOT_FILENAME}"
+    return f"{SNAPSHOT_PREFIX}/{tenant_id}/menu-{view}.json.gz"
+
+
+def search_index_key(tenant_id):
+    """
+    Key del índice de búsqueda persistido del tenant
+    """
+    return f"{SNAPSHOT_PREFIX}/{tenant_id}/{SEARCH_INDEX_FILENAME}"
+
+
+def build_menu_document(tenant_id, version, products):
+    """
+    Arma el documento del menú: productos ordenados por categoría y nombre,
+    más un índice de productIds por categoría
+    """
+    products = sorted(products, key=lambda p: (p.get('category', ''), p.get('name', '')))
+    categories = {}
+    for product in products:
+        categories.setdefault(product.get('category', ''), []).append(product['productId'])
+
+    return {
+        'tenantId': tenant_id,
+        'menuVersion': version,
+        'generatedAt': datetime.utcnow().isoformat() + 'Z',
+        'products': products,
+        'count': len(products),
+        'categories': [
+            {'category': category, 'productIds': product_ids}
+            for category, product_ids in categories.items()
+        ]
+    }
+
+
+def write_snapshot(s3_client, bucket, tenant_id, version, products, view=FULL_VIEW):
+    """
+    Serializa, comprime y guarda el snapshot del tenant.
+    Retorna el JSON serializado (texto) para poder servirlo directamente.
+    """
+    document = build_menu_document(tenant_id, version, products)
+    payload = json.dumps(document, default=str)
+    compressed_size = write_document(s3_client, bucket, snapshot_key(tenant_id, view), payload, version)
+
+    print(f"[MenuSnapshot] Snapshot {view} de {tenant_id} v{version}: {len(products)} productos, "
+          f"{len(payload)} bytes -> {compressed_size} bytes gzip")
+    return payload
+
+
+def read_snapshot(s3_client, bucket, tenant_id, expected_version=None, view=FULL_VIEW):
+    """
+    Retorna el JSON (texto) del snapshot del tenant, o None si no existe o
+    su versión no coincide con `expected_version`
+    """
+    return read_document(s3_client, bucket, snapshot_key(tenant_id, view), expected_version)
+
+
+def write_document(s3_client, bucket, key, payload, version):
+    """
+    Comprime y guarda un documento JSON (texto) con la versión del menú
+    como metadata. Retorna el tamaño comprimido en bytes.
+    """
+    body = gzip.compress(payload.encode('utf-8'))
+
+    local_dir = os.environ.get('MENU_SNAPSHOT_DIR')
+    if local_dir:
+        path = os.path.join(local_dir, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(body)
+        with open(path + '.meta.json', 'w') as f:
+            json.dump({'menu-version': str(version)}, f)
+    else:
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=body,
+            ContentType='application/json',
+            ContentEncoding='gzip',
+            Metadata={'menu-version': str(version)}
+        )
+
+    return len(body)
+
+
+def read_document(s3_client, bucket, key, expected_version=None):
+    """
+    Retorna el JSON (texto) guardado con write_document, o None si no existe
+    o su versión no coincide con `expected_version`
+    """
+    local_dir = os.environ.get('MENU_SNAPSHOT_DIR')
+    if local_dir:
+        path = os.path.join(local_dir, key)
+        if not os.path.exists(path):
+            return None
+        with open(path + '.meta.json') as f:
+            metadata = json.load(f)
+        if expected_version is not None and metadata.get('menu-version') != str(expected_version):
+            return None
+        with open(path, 'rb') as f:
+            body = f.read()
+    else:
+        try:
+            response = s3_client.get_object(Bucket=bucket, Key=key)
+        except s3_client.exceptions.NoSuchKey:
+            return None
+        metadata = response.get('Metadata', {})
+        if expected_version is not None and metadata.get('menu-version') != str(expected_version):
+            return None
+        body = response['Body'].read()
+
+    return gzip.decompress(body).decode('utf-8')
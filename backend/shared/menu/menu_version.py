@@ -0,0 +1,90 @@
+"""
+Versión del menú por tenant
+
+Cada sede guarda un contador `menuVersion` en la tabla de Sedes que se
+incrementa en cada cambio de productos. Los contenedores "warm" incluyen la
+versión en sus claves de cache, así que un cambio hecho en otro contenedor
+se detecta con un GetItem de un solo atributo en lugar de volver a leer el
+menú completo.
+
+La lectura de la versión también se cachea unos segundos
+(MENU_VERSION_CHECK_SECONDS), que es la ventana máxima de desactualización
+entre contenedores.
+
+Una sede que no existe en la tabla de Sedes no tiene versión: las rutas
+públicas lo usan para no regenerar snapshots de tenants inexistentes, y
+bump_menu_version no crea el ítem (lanza UnknownTenantError).
+"""
+
+import os
+import boto3
+from datetime import datetime
+
+from utils.ttl_cache import TTLCache
+
+VERSION_CHECK_SECONDS = float(os.environ.get('MENU_VERSION_CHECK_SECONDS', '5'))
+
+_sedes_table = None
+_version_cache = TTLCache(max_entries=512, ttl_seconds=VERSION_CHECK_SECONDS, name='menu-version')
+_NOT_CACHED = object()
+
+
+class UnknownTenantError(LookupError):
+    """Excepción lanzada al subir la versión del menú de una sede inexistente"""
+    pass
+
+
+def get_sedes_table():
+    """
+    Inicializa la tabla de Sedes de forma perezosa
+    """
+    global _sedes_table
+    if _sedes_table is None:
+        dynamodb = boto3.resource('dynamodb')
+        _sedes_table = dynamodb.Table(os.environ['SEDES_TABLE'])
+    return _sedes_table
+
+
+def get_menu_version(tenant_id, missing=0):
+    """
+    Retorna la versión actual del menú del tenant (0 si nunca cambió), o
+    `missing` si la sede no existe en la tabla de Sedes
+    """
+    version = _version_cache.get(tenant_id, _NOT_CACHED)
+    if version is _NOT_CACHED:
+        response = get_sedes_table().get_item(
+            Key={'tenantId': tenant_id},
+            ProjectionExpression='tenantId, menuVersion'
+        )
+        item = response.get('Item')
+        # None en el cache = la sede no existe
+        version = int(item.get('menuVersion', 0)) if item else None
+        _version_cache.set(tenant_id, version)
+    return missing if version is None else version
+
+
+def bump_menu_version(tenant_id):
+    """
+    Incrementa atómicamente la versión del menú del tenant y la retorna
+
+    Raises:
+        UnknownTenantError: Si la sede no existe (no se crea el ítem)
+    """
+    sedes_table = get_sedes_table()
+    try:
+        response = sedes_table.update_item(
+            Key={'tenantId': tenant_id},
+            UpdateExpression='ADD menuVersion :one SET menuUpdatedAt = :now',
+            ConditionExpression='attribute_exists(tenantId)',
+            ExpressionAttributeValues={
+                ':one': 1,
+                ':now': datetime.utcnow().isoformat() + 'Z'
+            },
+            ReturnValues='UPDATED_NEW'
+        )
+    except sedes_table.meta.client.exceptions.ConditionalCheckFailedException:
+        _version_cache.set(tenant_id, None)
+        raise UnknownTenantError(tenant_id)
+    version = int(response['Attributes']['menuVersion'])
+    _version_cache.set(tenant_id, version)
+    return version
@@ -0,0 +1,69 @@
+"""
+Convenciones de keys en S3 para las imágenes de productos
+
+Flujo de subida:
+1. POST /menu/items/{itemId}/image entrega una URL prefirmada (PUT) para
+   uploads/<tenantId>/<productId>/<uploadId>.<ext>
+2. El cliente sube la imagen directo a S3 (los bytes no pasan por Lambda)
+3. functions/image-processor copia el original a
+   images/<tenantId>/<productId>/<uploadId>.<ext>, genera variantes
+   <uploadId>-<ancho>.<ext> y registra imageKey/imageUrl en el producto
+
+El tenantId y productId viajan en la key, así el procesador no necesita
+estado adicional para saber a qué producto pertenece la subida.
+
+Solo images/* es de lectura pública (política del bucket en serverless.yml):
+el mismo bucket guarda snapshots y claim-checks de órdenes con datos de
+clientes. Las URLs se arman con IMAGES_BASE_URL (el dominio del bucket o, si
+se agrega, el de una distribución CloudFront).
+"""
+
+UPLOAD_PREFIX = 'uploads'
+IMAGE_PREFIX = 'images'
+
+# Content-Type permitido -> extensión del archivo
+ALLOWED_CONTENT_TYPES = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/webp': 'webp'
+}
+
+CONTENT_TYPES_BY_EXTENSION = {ext: content_type for content_type, ext in ALLOWED_CONTENT_TYPES.items()}
+
+
+def build_upload_key(tenant_id, product_id, upload_id, content_type):
+    """
+    Key temporal donde el cliente sube la imagen con la URL prefirmada
+    """
+    extension = ALLOWED_CONTENT_TYPES[content_type]
+    return f"{UPLOAD_PREFIX}/{tenant_id}/{product_id}/{upload_id}.{extension}"
+
+
+def parse_upload_key(key):
+    """
+    Extrae (tenantId, productId, uploadId, extensión) de una key de subida.
+    Retorna None si la key no sigue la convención.
+    """
+    parts = key.split('/')
+    if len(parts) != 4 or parts[0] != UPLOAD_PREFIX:
+        return None
+    _, tenant_id, product_id, filename = parts
+    upload_id, _, extension = filename.rpartition('.')
+    if not tenant_id or not product_id or not upload_id or extension not in CONTENT_TYPES_BY_EXTENSION:
+        return None
+    return tenant_id, product_id, upload_id, extension
+
+
+def build_image_key(tenant_id, product_id, upload_id, extension, width=None):
+    """
+    Key definitiva de la imagen (o de su variante de `width` px de ancho)
+    """
+    suffix = f"-{width}" if width else ''
+    return f"{IMAGE_PREFIX}/{tenant_id}/{product_id}/{upload_id}{suffix}.{extension}"
+
+
+def build_image_url(base_url, key):
+    """
+    URL pública de una imagen (key bajo images/) a partir del dominio que la sirve
+    """
+    return f"{base_url.rstrip('/')}/{key}"
@@ -0,0 +1,146 @@
+"""
+Índice invertido en memoria para búsqueda de productos del menú
+
+Indexa name, tags y description de los productos de un tenant. Los tokens se
+normalizan (minúsculas, sin tildes) y se guardan ordenados para resolver
+búsquedas por prefijo con bisect, así "ham" encuentra "hamburguesa".
+Todos los términos de la consulta deben coincidir (AND); el puntaje suma
+el peso del campo donde aparece cada término (name > tags > description) y
+favorece coincidencias exactas sobre prefijos.
+
+Cada término expande como máximo MAX_PREFIX_EXPANSIONS tokens; si un prefijo
+muy corto cubre más, search() lo indica con truncated=True para que el
+cliente pueda afinar la consulta.
+
+El índice se serializa con to_dict()/from_dict() para persistirlo junto al
+snapshot del menú y evitar reconstruirlo en cold starts.
+
+Uso:
+    from menu.search_index import MenuSearchIndex
+
+    index = MenuSearchIndex.build(tenant_id, version, products)
+    results, truncated = index.search('ham ques', limit=10)
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import Any, Dict, List, Tuple
+
+FIELD_WEIGHTS = {
+    'name': 3,
+    'tags': 2,
+    'description': 1
+}
+
+# Atributos que se guardan por producto para responder sin ir a DynamoDB
+DOCUMENT_FIELDS = ['productId', 'name', 'description', 'category', 'price', 'currency',
+                   'isAvailable', 'imageUrl', 'tags']
+
+EXACT_MATCH_BONUS = 1.5
+MAX_PREFIX_EXPANSIONS = 50
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text: str) -> str:
+    """Minúsculas y sin tildes: 'Limón' -> 'limon'"""
+    decomposed = unicodedata.normalize('NFKD', str(text).lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    """Separa un texto en tokens alfanuméricos normalizados"""
+    return _TOKEN_PATTERN.findall(normalize(text))
+
+
+class MenuSearchIndex:
+    """Índice invertido token -> {productId: peso} de un tenant"""
+
+    def __init__(self, tenant_id: str, version: int,
+                 documents: Dict[str, Dict[str, Any]], postings: Dict[str, Dict[str, int]]):
+        self.tenant_id = tenant_id
+        self.version = version
+        self.documents = documents
+        self.postings = postings
+        self.tokens = sorted(postings)
+
+    @classmethod
+    def build(cls, tenant_id: str, version: int, products: List[Dict[str, Any]]) -> 'MenuSearchIndex':
+        """Construye el índice a partir de los productos del tenant"""
+        documents = {}
+        postings = {}
+        for product in products:
+            product_id = product['productId']
+            documents[product_id] = {field: product.get(field) for field in DOCUMENT_FIELDS}
+
+            for field, weight in FIELD_WEIGHTS.items():
+                value = product.get(field)
+                if not value:
+                    continue
+                text = ' '.join(value) if isinstance(value, list) else value
+                for token in set(tokenize(text)):
+                    entry = postings.setdefault(token, {})
+                    entry[product_id] = max(entry.get(product_id, 0), weight)
+
+        return cls(tenant_id, version, documents, postings)
+
+    def search(self, query: str, limit: int = 20) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Retorna los productos que coinciden con todos los términos de la
+        consulta, ordenados por puntaje, y si algún prefijo se truncó en
+        MAX_PREFIX_EXPANSIONS tokens (pueden faltar coincidencias)
+        """
+        terms = tokenize(query)
+        if not terms:
+            return [], False
+
+        scores = None
+        truncated = False
+        for term in terms:
+            term_scores, term_truncated = self._match_term(term)
+            truncated = truncated or term_truncated
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    product_id: score + term_scores[product_id]
+                    for product_id, score in scores.items()
+                    if product_id in term_scores
+                }
+            if not scores:
+                return [], truncated
+
+        ranked = sorted(
+            scores.items(),
+            key=lambda entry: (-entry[1], self.documents[entry[0]].get('name') or '')
+        )
+        return [self.documents[product_id] for product_id, _ in ranked[:limit]], truncated
+
+    def _match_term(self, term: str) -> Tuple[Dict[str, float], bool]:
+        scores = {}
+        position = bisect_left(self.tokens, term)
+        end = position + MAX_PREFIX_EXPANSIONS
+        for token in self.tokens[position:end]:
+            if not token.startswith(term):
+                break
+            bonus = EXACT_MATCH_BONUS if token == term else 1.0
+            for product_id, weight in self.postings[token].items():
+                scores[product_id] = max(scores.get(product_id, 0), weight * bonus)
+        # Truncado si el primer token fuera de la ventana también tiene el prefijo
+        truncated = end < len(self.tokens) and self.tokens[end].startswith(term)
+        return scores, truncated
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Forma serializable del índice (para persistirlo)"""
+        return {
+            'tenantId': self.tenant_id,
+            'menuVersion': self.version,
+            'documents': self.documents,
+            'postings': self.postings
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'MenuSearchIndex':
+        """Reconstruye un índice persistido con to_dict()"""
+        return cls(data['tenantId'], data['menuVersion'], data['documents'], data['postings'])
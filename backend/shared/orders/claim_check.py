@@ -0,0 +1,95 @@
+"""
+Claim-check para el estado del workflow de órdenes
+
+Step Functions copia el estado completo en cada transición y lo limita a
+256 KB. Cuando `items` + `userInfo` de una orden superan
+CLAIM_CHECK_THRESHOLD_BYTES, PrepareOrderData los guarda una sola vez en S3
+(order-payloads/<tenantId>/<referenceId>.json) y entre estados solo viaja
+`payloadRef`. Cada paso recupera los campos que necesita con load_payload().
+
+Las órdenes normales no cambian: por debajo del umbral el estado viaja
+completo, como antes.
+
+Uso:
+    from orders.claim_check import offload_payload, load_payload
+
+    state = offload_payload(prepared_data, s3, bucket, request_id)   # productor
+    state = load_payload(event, s3, fields=('items',))               # consumidor
+"""
+
+import json
+import os
+import uuid
+from decimal import Decimal
+
+PAYLOAD_PREFIX = 'order-payloads'
+PAYLOAD_FIELDS = ('items', 'userInfo')
+THRESHOLD_BYTES = int(os.environ.get('CLAIM_CHECK_THRESHOLD_BYTES', str(32 * 1024)))
+
+
+def offload_payload(state, s3_client, bucket, reference_id=None, threshold=THRESHOLD_BYTES):
+    """
+    Si los campos pesados del estado superan `threshold` bytes, los guarda en
+    S3 y retorna una copia del estado con `payloadRef` en su lugar. Si no,
+    retorna el estado sin cambios.
+    """
+    payload = {field: state[field] for field in PAYLOAD_FIELDS if field in state}
+    body = json.dumps(payload, default=_json_default)
+    if len(body) <= threshold:
+        return state
+
+    key = f"{PAYLOAD_PREFIX}/{state.get('tenantId', 'unknown')}/{reference_id or uuid.uuid4()}.json"
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=body.encode('utf-8'),
+        ContentType='application/json'
+    )
+    print(f"[ClaimCheck] Payload de {len(body)} bytes guardado en s3://{bucket}/{key}")
+
+    reduced = {field: value for field, value in state.items() if field not in PAYLOAD_FIELDS}
+    reduced['payloadRef'] = {
+        'bucket': bucket,
+        'key': key,
+        'size': len(body),
+        'itemCount': len(state.get('items', []))
+    }
+    return reduced
+
+
+def load_payload(state, s3_client, fields=PAYLOAD_FIELDS):
+    """
+    Retorna una copia del estado con `fields` recuperados del claim-check.
+    Sin `payloadRef` retorna el estado sin cambios.
+    """
+    ref = state.get('payloadRef')
+    if not ref:
+        return state
+
+    response = s3_client.get_object(Bucket=ref['bucket'], Key=ref['key'])
+    payload = json.loads(response['Body'].read())
+    loaded = dict(state)
+    for field in fields:
+        if field in payload:
+            loaded[field] = payload[field]
+    return loaded
+
+
+def strip_payload(output, state):
+    """
+    Si el estado de entrada usaba claim-check, quita los campos pesados de la
+    salida de un paso y propaga `payloadRef`
+    """
+    ref = state.get('payloadRef')
+    if not ref:
+        return output
+    stripped = {field: value for field, value in output.items() if field not in PAYLOAD_FIELDS}
+    stripped['payloadRef'] = ref
+    return stripped
+
+
+def _json_default(value):
+    # Igual que el runtime de Lambda: los Decimal se serializan como número
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
@@ -0,0 +1,123 @@
+"""
+Construcción de órdenes compartida por el workflow (PrepareOrderData /
+PersistAndBuildOrder) y la carga masiva (POST /orders/batch)
+
+Las funciones no hacen I/O: reciben los productos ya leídos y lanzan
+ValueError con el motivo cuando la orden no es válida.
+"""
+
+from decimal import Decimal
+
+
+def validate_items(items):
+    """
+    Valida la forma de los items de una orden (antes de leer productos)
+    """
+    if not items or len(items) == 0:
+        raise ValueError("La orden debe contener al menos un item")
+
+    for item in items:
+        product_id = item.get('productId')
+        quantity = item.get('quantity', 1)
+
+        if not product_id:
+            raise ValueError("Cada item debe tener un productId")
+
+        if quantity <= 0:
+            raise ValueError(f"Cantidad inválida para producto {product_id}")
+
+
+def enrich_items(items, products, tenant_id):
+    """
+    Enriquece los items con nombre, precio y tiempo de preparación.
+    `products` es {productId: producto} con isAvailable normalizado a bool.
+
+    Returns:
+        (items enriquecidos, total) con importes Decimal
+    """
+    enriched_items = []
+    total = Decimal('0')
+
+    for item in items:
+        product_id = item['productId']
+        quantity = item.get('quantity', 1)
+        product = products.get(product_id)
+
+        if product is None:
+            raise ValueError(f"Error al validar producto {product_id}: Producto {product_id} no encontrado")
+
+        # Validar disponibilidad
+        if not product['isAvailable']:
+            raise ValueError(f"Error al validar producto {product_id}: "
+                             f"Producto {product.get('name', product_id)} no está disponible")
+
+        # Validar que el producto pertenece al tenant
+        if product.get('tenantId') != tenant_id:
+            raise ValueError(f"Error al validar producto {product_id}: "
+                             f"Producto {product_id} no pertenece a la sede {tenant_id}")
+
+        unit_price = Decimal(str(product['price']))
+        item_total = unit_price * Decimal(str(quantity))
+
+        enriched_items.append({
+            'productId': product_id,
+            'name': product.get('name', 'Unknown'),
+            'quantity': quantity,
+            'unitPrice': unit_price,
+            'subtotal': item_total,
+            'preparationTimeMinutes': product.get('preparationTimeMinutes', product.get('preparationTime', 15))
+        })
+
+        total += item_total
+
+    return enriched_items, total
+
+
+def normalize_product(item, static_fields):
+    """
+    Retorna (atributos estables, disponibilidad) de un item de la tabla de
+    productos. Los productos del seed usan "available" en lugar de "isAvailable".
+    """
+    static = {field: item[field] for field in static_fields if field in item}
+    is_available = bool(item.get('isAvailable', item.get('available', False)))
+    return static, is_available
+
+
+def build_order_record(order_id, data, current_time):
+    """
+    Item de la tabla de órdenes a partir de los datos preparados, con todos
+    los números como Decimal para DynamoDB
+    """
+    items = []
+    for item in data['items']:
+        items.append({
+            'productId': item['productId'],
+            'name': item['name'],
+            'quantity': item['quantity'],
+            'unitPrice': Decimal(str(item['unitPrice'])),
+            'subtotal': Decimal(str(item['subtotal'])),
+            'preparationTimeMinutes': Decimal(str(item['preparationTimeMinutes']))
+        })
+
+    return {
+        'orderId': order_id,
+        'tenantId': data['tenantId'],
+        'userId': data['userId'],
+        'userInfo': data.get('userInfo', {}),
+        'status': 'CREATED',
+        'items': items,
+        'notes': data.get('notes', ''),
+        'paymentMethod': data.get('paymentMethod', 'CASH'),
+        'deliveryAddress': data.get('deliveryAddress', ''),
+        'total': Decimal(str(data['total'])),
+        'estimatedPreparationTime': Decimal(str(data.get('estimatedPreparationTime', 15))),
+        'createdAt': current_time,
+        'updatedAt': current_time,
+        'timeline': {
+            'CREATED': current_time
+        },
+        # cookId y dispatcherId no se escriben hasta que se asignan: UpdateStatus
+        # los asigna con if_not_exists
+        'resolvedAt': None
+    }
+
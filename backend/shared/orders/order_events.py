@@ -0,0 +1,116 @@
+"""
+Eventos de órdenes a partir del stream de DynamoDB de la tabla de órdenes
+
+Los handlers ya no publican en EventBridge: cada escritura de una orden
+queda en el stream (NEW_AND_OLD_IMAGES) y la Lambda orderEventsRelay
+traduce los registros a eventos con events_from_stream_record():
+- INSERT -> ORDER_CREATED
+- MODIFY con cambio de status -> ORDER_STATUS_CHANGED (changedBy y notes
+  salen de statusChangedBy / statusNotes, que UpdateStatus escribe junto
+  con el estado)
+El resto de registros (asignaciones, borrados) no generan eventos.
+
+El detail es liviano y de tamaño acotado: no lleva items ni userInfo (solo
+itemCount); quien necesite la orden completa la lee por orderId. Así una
+entrada nunca se acerca al límite de 256 KB de put_events.
+
+Uso:
+    from orders.order_events import events_from_stream_record, build_event_entry
+
+    for detail_type, detail in events_from_stream_record(record):
+        entry = build_event_entry(detail_type, detail, event_bus_name)
+"""
+
+import json
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeDeserializer
+
+EVENT_SOURCE = 'fridays.orders'
+ORDER_CREATED = 'ORDER_CREATED'
+ORDER_STATUS_CHANGED = 'ORDER_STATUS_CHANGED'
+
+# Las notas del cambio de estado vienen del cliente: se recortan en el evento
+NOTES_MAX_LENGTH = 1000
+
+_deserializer = TypeDeserializer()
+
+
+def events_from_stream_record(record):
+    """
+    Retorna la lista de (detailType, detail) que genera un registro del stream
+    """
+    change = record.get('dynamodb', {})
+    new_image = deserialize_image(change.get('NewImage'))
+    old_image = deserialize_image(change.get('OldImage'))
+
+    if record.get('eventName') == 'INSERT' and new_image:
+        return [(ORDER_CREATED, build_order_created_detail(new_image, new_image.get('createdAt')))]
+
+    if record.get('eventName') == 'MODIFY' and new_image and old_image \
+            and new_image.get('status') != old_image.get('status'):
+        return [(ORDER_STATUS_CHANGED, build_status_changed_detail(old_image, new_image))]
+
+    return []
+
+
+def deserialize_image(image):
+    """Convierte una imagen del stream (formato de bajo nivel) a tipos de Python"""
+    if not image:
+        return None
+    return {key: _deserializer.deserialize(value) for key, value in image.items()}
+
+
+def build_order_created_detail(order, timestamp):
+    """
+    Detail del evento ORDER_CREATED que consumen los WebSockets
+    """
+    return {
+        'orderId': order['orderId'],
+        'tenantId': order.get('tenantId'),
+        'userId': order.get('userId'),
+        'status': 'CREATED',
+        'total': order.get('total'),
+        'itemCount': len(order.get('items', [])),
+        'timestamp': timestamp,
+        'eventType': ORDER_CREATED
+    }
+
+
+def build_status_changed_detail(old_order, new_order):
+    """
+    Detail del evento ORDER_STATUS_CHANGED a partir de la orden antes y
+    después del cambio
+    """
+    return {
+        'orderId': new_order['orderId'],
+        'tenantId': new_order.get('tenantId'),
+        'userId': new_order.get('userId'),
+        'previousStatus': old_order.get('status'),
+        'newStatus': new_order.get('status'),
+        'changedBy': new_order.get('statusChangedBy'),
+        'notes': (new_order.get('statusNotes') or '')[:NOTES_MAX_LENGTH],
+        'total': new_order.get('total'),
+        'itemCount': len(new_order.get('items', [])),
+        'timestamp': new_order.get('updatedAt'),
+        'eventType': ORDER_STATUS_CHANGED
+    }
+
+
+def build_event_entry(detail_type, detail, event_bus_name):
+    """
+    Entrada de put_events para un evento de orden
+    """
+    return {
+        'Source': EVENT_SOURCE,
+        'DetailType': detail_type,
+        'Detail': json.dumps(detail, default=_json_default),
+        'EventBusName': event_bus_name
+    }
+
+
+def _json_default(value):
+    # Igual que el runtime de Lambda: los Decimal se serializan como número
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
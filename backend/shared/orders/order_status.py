@@ -0,0 +1,87 @@
+"""
+Máquina de estados de las órdenes
+
+TRANSITIONS es la tabla declarativa de cambios permitidos. Al importar el
+módulo se compila en:
+- ALLOWED_TRANSITIONS: set de pares (desde, hacia) para validar en O(1)
+- PREVIOUS_STATUSES: estados desde los que se puede llegar a cada estado,
+  para la condición de escritura (#status IN (...)), que hace cumplir la
+  transición de forma atómica en DynamoDB
+
+Uso:
+    from orders.order_status import previous_statuses, build_transition_condition
+
+    if not previous_statuses(new_status):
+        ...  # rechazar sin I/O
+    condition, values = build_transition_condition(new_status, expected_status)
+"""
+
+ORDER_STATUSES = (
+    'CREATED',
+    'COOKING',
+    'READY',
+    'PACKAGED',
+    'ON_THE_WAY',
+    'DELIVERED',
+    'CANCELLED'
+)
+
+FINAL_STATUSES = ('DELIVERED', 'CANCELLED')
+
+# estado actual -> estados a los que puede pasar
+TRANSITIONS = {
+    'CREATED': ('COOKING', 'CANCELLED'),
+    'COOKING': ('READY', 'CANCELLED'),
+    'READY': ('PACKAGED', 'CANCELLED'),
+    'PACKAGED': ('ON_THE_WAY',),
+    'ON_THE_WAY': ('DELIVERED',),
+    'DELIVERED': (),
+    'CANCELLED': ()
+}
+
+
+def _compile(transitions):
+    allowed = frozenset(
+        (from_status, to_status)
+        for from_status, to_statuses in transitions.items()
+        for to_status in to_statuses
+    )
+    previous = {
+        status: tuple(from_status for from_status in ORDER_STATUSES if (from_status, status) in allowed)
+        for status in ORDER_STATUSES
+    }
+    return allowed, previous
+
+
+ALLOWED_TRANSITIONS, PREVIOUS_STATUSES = _compile(TRANSITIONS)
+
+
+def is_valid_status(status):
+    """True si `status` es un estado de orden conocido"""
+    return status in PREVIOUS_STATUSES
+
+
+def can_transition(from_status, to_status):
+    """True si la orden puede pasar de `from_status` a `to_status`"""
+    return (from_status, to_status) in ALLOWED_TRANSITIONS
+
+
+def previous_statuses(status):
+    """Estados desde los que se puede llegar a `status` (vacío si ninguno)"""
+    return PREVIOUS_STATUSES.get(status, ())
+
+
+def build_transition_condition(new_status, expected_status=None):
+    """
+    Condición de escritura que solo se cumple si la orden está en un estado
+    desde el que puede pasar a `new_status` (o exactamente en
+    `expected_status`, si se indica). Usa el nombre #status.
+
+    Returns:
+        (expresión, ExpressionAttributeValues)
+    """
+    if expected_status is not None:
+        return '#status = :expectedStatus', {':expectedStatus': expected_status}
+
+    values = {f':from{i}': status for i, status in enumerate(previous_statuses(new_status))}
+    return f"#status IN ({', '.join(values)})", values
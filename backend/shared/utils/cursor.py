@@ -0,0 +1,103 @@
+"""
+Cursores opacos para paginación de DynamoDB
+
+Convierte el LastEvaluatedKey completo (incluidas las claves del GSI) en un
+token firmado y URL-safe, y lo vuelve a convertir en ExclusiveStartKey.
+La firma HMAC evita que el cliente manipule la clave, y el `scope` liga el
+cursor a la ruta de acceso que lo generó (tabla/índice/tenant), de modo que
+un cursor de un listado no sirve para otro.
+
+La clave de firma no es el secreto recibido sino una clave derivada
+(HMAC(secret, "cursor-v1")): así el mismo secreto del JWT puede firmar
+cursores sin que un cursor sirva como oráculo de firmas de tokens.
+
+Uso:
+    from utils.cursor import encode_cursor, decode_cursor, InvalidCursorError
+
+    token = encode_cursor(response['LastEvaluatedKey'], secret, scope='tenantId-index#sede-1')
+    start_key = decode_cursor(token, secret, scope='tenantId-index#sede-1')
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+from decimal import Decimal
+from typing import Any, Dict
+
+
+class InvalidCursorError(Exception):
+    """Excepción lanzada cuando un cursor está mal formado o su firma no coincide"""
+    pass
+
+
+def encode_cursor(last_evaluated_key: Dict[str, Any], secret: str, scope: str = '') -> str:
+    """
+    Serializa y firma un LastEvaluatedKey
+    """
+    payload = json.dumps(
+        {key: _encode_value(value) for key, value in last_evaluated_key.items()},
+        separators=(',', ':'),
+        sort_keys=True
+    ).encode('utf-8')
+    signature = _sign(payload, secret, scope)
+    return f"{_b64encode(payload)}.{_b64encode(signature)}"
+
+
+def decode_cursor(token: str, secret: str, scope: str = '') -> Dict[str, Any]:
+    """
+    Valida la firma de un cursor y retorna el ExclusiveStartKey
+
+    Raises:
+        InvalidCursorError: Si el token está mal formado o fue alterado
+    """
+    try:
+        encoded_payload, encoded_signature = token.split('.')
+        payload = _b64decode(encoded_payload)
+        signature = _b64decode(encoded_signature)
+    except (ValueError, AttributeError) as e:
+        raise InvalidCursorError(f"Cursor mal formado: {str(e)}")
+
+    if not hmac.compare_digest(signature, _sign(payload, secret, scope)):
+        raise InvalidCursorError("Firma de cursor inválida")
+
+    try:
+        data = json.loads(payload)
+    except ValueError as e:
+        raise InvalidCursorError(f"Cursor mal formado: {str(e)}")
+
+    return {key: _decode_value(value) for key, value in data.items()}
+
+
+# Etiqueta de derivación de la clave de firma (cambiarla invalida los cursores emitidos)
+CURSOR_KEY_LABEL = b'cursor-v1'
+
+
+def _derive_key(secret: str) -> bytes:
+    return hmac.new(secret.encode('utf-8'), CURSOR_KEY_LABEL, hashlib.sha256).digest()
+
+
+def _sign(payload: bytes, secret: str, scope: str) -> bytes:
+    message = scope.encode('utf-8') + b'\x00' + payload
+    return hmac.new(_derive_key(secret), message, hashlib.sha256).digest()[:16]
+
+
+def _encode_value(value: Any) -> Any:
+    # Las claves numéricas de DynamoDB llegan como Decimal: se preservan como texto
+    if isinstance(value, Decimal):
+        return {'N': str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and set(value) == {'N'}:
+        return Decimal(value['N'])
+    return value
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
@@ -0,0 +1,207 @@
+"""
+Helpers de escritura/lectura por lotes en DynamoDB
+
+batch_write_item acepta hasta 25 items por llamada y puede devolver parte
+de ellos en UnprocessedItems cuando la tabla está bajo throttling. Estos
+helpers trocean la entrada, reintentan lo no procesado con backoff
+exponencial con jitter completo y reportan qué items no se pudieron escribir.
+transact_write_actions hace lo mismo para escrituras condicionales
+(TransactWriteItems, hasta 100 acciones por llamada) y batch_get_items para
+lecturas (BatchGetItem, hasta 100 claves por llamada, con UnprocessedKeys).
+
+Se espera el cliente de un resource de DynamoDB (`dynamodb.meta.client`):
+acepta y devuelve tipos nativos de Python y, a diferencia del resource,
+es seguro entre hilos.
+
+Uso:
+    from utils.dynamo_batch import batch_write_items
+
+    failed = batch_write_items(dynamodb.meta.client, 'products', items, parallel=True)
+    for item, error in failed:
+        ...
+"""
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+BATCH_WRITE_SIZE = 25
+BATCH_GET_SIZE = 100
+TRANSACT_WRITE_SIZE = 100
+RETRYABLE_CANCELLATION_CODES = ('TransactionConflict', 'ThrottlingError', 'ProvisionedThroughputExceeded')
+MAX_ATTEMPTS = 6
+BASE_DELAY_SECONDS = 0.05
+MAX_DELAY_SECONDS = 2.0
+
+
+def chunked(items: List[Any], size: int) -> List[List[Any]]:
+    """Divide una lista en bloques de `size` elementos"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def backoff_delay(attempt: int) -> float:
+    """Backoff exponencial con jitter completo (0 .. base * 2^attempt, con tope)"""
+    return random.uniform(0, min(MAX_DELAY_SECONDS, BASE_DELAY_SECONDS * (2 ** attempt)))
+
+
+def batch_write_items(client, table_name: str, items: List[Dict[str, Any]],
+                      parallel: bool = False, max_workers: int = 4,
+                      max_attempts: int = MAX_ATTEMPTS) -> List[Tuple[Dict[str, Any], str]]:
+    """
+    Escribe `items` con PutRequest en bloques de 25.
+
+    Returns:
+        Lista de (item, mensaje de error) con los items que no se escribieron.
+        Lista vacía si todo se escribió.
+    """
+    chunks = chunked(items, BATCH_WRITE_SIZE)
+
+    def write(chunk):
+        return _write_chunk(client, table_name, chunk, max_attempts)
+
+    if parallel and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(write, chunks))
+    else:
+        results = [write(chunk) for chunk in chunks]
+
+    return [failure for chunk_failures in results for failure in chunk_failures]
+
+
+def _write_chunk(client, table_name, chunk, max_attempts):
+    pending = [{'PutRequest': {'Item': item}} for item in chunk]
+
+    for attempt in range(max_attempts):
+        try:
+            response = client.batch_write_item(RequestItems={table_name: pending})
+        except Exception as e:
+            print(f"[DynamoBatch] Error en batch_write_item ({len(pending)} items): {str(e)}")
+            return [(request['PutRequest']['Item'], str(e)) for request in pending]
+
+        pending = response.get('UnprocessedItems', {}).get(table_name, [])
+        if not pending:
+            return []
+
+        if attempt + 1 < max_attempts:
+            print(f"[DynamoBatch] {len(pending)} items sin procesar, reintento {attempt + 1}/{max_attempts - 1}")
+            time.sleep(backoff_delay(attempt))
+
+    return [
+        (request['PutRequest']['Item'], 'UnprocessedItems tras agotar reintentos')
+        for request in pending
+    ]
+
+
+def transact_write_actions(client, actions: List[Dict[str, Any]],
+                           max_attempts: int = MAX_ATTEMPTS) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Ejecuta acciones de TransactWriteItems (Put/Update/Delete/ConditionCheck)
+    en transacciones de hasta 100 acciones.
+
+    Si una transacción se cancela, las acciones que fallaron su condición se
+    reportan y el resto del bloque se reintenta sin ellas; los conflictos y
+    el throttling se reintentan con backoff.
+
+    Returns:
+        Lista de (acción, motivo) de las acciones que no se aplicaron. El
+        motivo es el CancellationReason de DynamoDB ({'Code', 'Message',
+        'Item' si se pidió ReturnValuesOnConditionCheckFailure}).
+    """
+    failures = []
+    for chunk in chunked(actions, TRANSACT_WRITE_SIZE):
+        failures.extend(_transact_chunk(client, chunk, max_attempts))
+    return failures
+
+
+def _transact_chunk(client, chunk, max_attempts):
+    pending = chunk
+    failures = []
+
+    for attempt in range(max_attempts):
+        try:
+            client.transact_write_items(TransactItems=pending)
+            return failures
+        except client.exceptions.TransactionCanceledException as e:
+            reasons = e.response.get('CancellationReasons') or []
+            if len(reasons) != len(pending):
+                # Sin un motivo por acción no se sabe cuál falló: se reporta todo el bloque
+                print(f"[DynamoBatch] Transacción cancelada con {len(reasons)} motivos para "
+                      f"{len(pending)} acciones: {str(e)}")
+                return failures + [(action, {'Code': 'Error', 'Message': str(e)}) for action in pending]
+        except Exception as e:
+            print(f"[DynamoBatch] Error en transact_write_items ({len(pending)} acciones): {str(e)}")
+            return failures + [(action, {'Code': 'Error', 'Message': str(e)}) for action in pending]
+
+        retry = []
+        throttled = False
+        for action, reason in zip(pending, reasons):
+            code = reason.get('Code', 'None')
+            if code == 'None':
+                # La acción era válida: se canceló por culpa de otra del bloque
+                retry.append(action)
+            elif code in RETRYABLE_CANCELLATION_CODES:
+                retry.append(action)
+                throttled = True
+            else:
+                failures.append((action, reason))
+
+        pending = retry
+        if not pending:
+            return failures
+        if throttled and attempt + 1 < max_attempts:
+            time.sleep(backoff_delay(attempt))
+
+    return failures + [(action, {'Code': 'MaxAttemptsExceeded'}) for action in pending]
+
+
+def batch_get_items(client, table_name: str, keys: List[Dict[str, Any]],
+                    projection: str = None, expression_names: Dict[str, str] = None,
+                    consistent_read: bool = False,
+                    max_attempts: int = MAX_ATTEMPTS) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Lee `keys` con BatchGetItem en bloques de 100. Las claves duplicadas se
+    leen una sola vez (DynamoDB rechaza duplicados en la misma llamada).
+    Con consistent_read la lectura es fuertemente consistente.
+
+    Returns:
+        (items encontrados, claves que quedaron en UnprocessedKeys tras
+        agotar los reintentos). Las claves inexistentes simplemente no
+        aparecen en los items.
+    """
+    unique_keys = list({tuple(sorted(key.items())): key for key in keys}.values())
+
+    items = []
+    unprocessed = []
+    for chunk in chunked(unique_keys, BATCH_GET_SIZE):
+        chunk_items, chunk_unprocessed = _get_chunk(client, table_name, chunk, projection,
+                                                    expression_names, consistent_read, max_attempts)
+        items.extend(chunk_items)
+        unprocessed.extend(chunk_unprocessed)
+    return items, unprocessed
+
+
+def _get_chunk(client, table_name, chunk, projection, expression_names, consistent_read, max_attempts):
+    request = {'Keys': chunk}
+    if consistent_read:
+        request['ConsistentRead'] = True
+    if projection:
+        request['ProjectionExpression'] = projection
+    if expression_names:
+        request['ExpressionAttributeNames'] = expression_names
+
+    items = []
+    for attempt in range(max_attempts):
+        response = client.batch_get_item(RequestItems={table_name: request})
+        items.extend(response.get('Responses', {}).get(table_name, []))
+
+        pending = response.get('UnprocessedKeys', {}).get(table_name)
+        if not pending:
+            return items, []
+        request = pending
+
+        if attempt + 1 < max_attempts:
+            print(f"[DynamoBatch] {len(pending['Keys'])} claves sin procesar, reintento {attempt + 1}/{max_attempts - 1}")
+            time.sleep(backoff_delay(attempt))
+
+    return items, request['Keys']
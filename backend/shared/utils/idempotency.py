@@ -0,0 +1,74 @@
+"""
+Registro de idempotencia en DynamoDB
+
+Guarda el resultado de una operación bajo una clave (p. ej.
+"<requestId>#PersistAndBuildOrder") con expiración por TTL. Si la operación
+se repite con la misma clave (reintento de Step Functions, cliente que
+reenvía el POST) se retorna el resultado guardado en lugar de volver a
+escribir.
+
+Los resultados se guardan como JSON (texto) para no depender de los tipos
+de DynamoDB; los Decimal se serializan como número, igual que el runtime de
+Lambda.
+
+Uso:
+    from utils.idempotency import get_result, save_result
+
+    previous = get_result(f"{request_id}#PersistAndBuildOrder")
+    if previous is not None:
+        return previous
+    ...
+    save_result(f"{request_id}#PersistAndBuildOrder", output)
+"""
+
+import json
+import os
+import time
+import boto3
+from datetime import datetime
+from decimal import Decimal
+
+DEFAULT_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', str(24 * 60 * 60)))
+
+_idempotency_table = None
+
+
+def get_idempotency_table():
+    """
+    Inicializa la tabla de idempotencia de forma perezosa
+    """
+    global _idempotency_table
+    if _idempotency_table is None:
+        dynamodb = boto3.resource('dynamodb')
+        _idempotency_table = dynamodb.Table(os.environ['IDEMPOTENCY_TABLE'])
+    return _idempotency_table
+
+
+def get_result(key):
+    """
+    Retorna el resultado guardado para `key`, o None si no existe o expiró
+    (DynamoDB puede tardar en borrar los items con TTL vencido)
+    """
+    response = get_idempotency_table().get_item(Key={'idempotencyKey': key}, ConsistentRead=True)
+    record = response.get('Item')
+    if not record or int(record.get('ttl', 0)) < int(time.time()):
+        return None
+    return json.loads(record['result'])
+
+
+def save_result(key, result, ttl_seconds=DEFAULT_TTL_SECONDS):
+    """
+    Guarda el resultado de `key` (sobrescribe el anterior si existía)
+    """
+    get_idempotency_table().put_item(Item={
+        'idempotencyKey': key,
+        'result': json.dumps(result, default=_json_default),
+        'createdAt': datetime.utcnow().isoformat() + 'Z',
+        'ttl': int(time.time()) + ttl_seconds
+    })
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
@@ -0,0 +1,97 @@
+"""
+Cache en memoria con TTL y límite de entradas (LRU)
+
+Se instancia a nivel de módulo, por lo que sobrevive entre invocaciones
+"warm" del mismo contenedor Lambda. Cada contenedor tiene su propia copia:
+la coherencia entre contenedores se resuelve incluyendo una versión en la
+clave (ver shared/menu/menu_version.py).
+
+Uso:
+    from utils.ttl_cache import TTLCache
+
+    cache = TTLCache(max_entries=256, ttl_seconds=30, name='menu')
+
+    value = cache.get(key)
+    if value is None:
+        value = load_from_dynamodb()
+        cache.set(key, value)
+"""
+
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Cache LRU acotado con expiración por entrada y contadores de hit/miss"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 60, name: str = 'cache'):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Retorna el valor cacheado o `default` si no existe o expiró.
+        Cuenta un hit o un miss según el caso.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Guarda un valor. Si se supera max_entries se descarta la entrada
+        usada hace más tiempo.
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Elimina una entrada si existe"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_matching(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Elimina todas las entradas cuya clave cumpla `predicate`.
+        Retorna el número de entradas eliminadas.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        """Vacía el cache (los contadores se mantienen)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores para logs: hits, misses, hitRate y tamaño actual"""
+        total = self.hits + self.misses
+        return {
+            'name': self.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': round(self.hits / total, 3) if total else 0.0,
+            'size': len(self._entries)
+        }
@@ -8,10 +8,11 @@ function getAuthHeaders(): HeadersInit {
   return token ? { Authorization: `Bearer ${token}` } : {};
 }
 
+// Vista de administración: incluye productos no disponibles (requiere auth admin)
 export async function fetchFood(): Promise<FoodResponse> {
-  const url = `${BASE}/menu?limit=20`;
+  const url = `${BASE}/menu/admin?limit=20`;
   console.log('fetchFood URL:', url);
-  const res = await fetch(url, { method: 'GET' });
+  const res = await fetch(url, { method: 'GET', headers: getAuthHeaders() });
   console.log('fetchFood response status:', res.status);
   if (!res.ok) {
     const errorText = await res.text();
@@ -22,10 +23,10 @@ export async function fetchFood(): Promise<FoodResponse> {
   return data as FoodResponse;
 }
 
-// Listar productos por categoría (FOOD, DRINK, etc.)
+// Listar productos por categoría (FOOD, DRINK, etc.), incluidos los no disponibles
 export async function fetchFoodByCategory(category: string): Promise<FoodResponse> {
-  const url = `${BASE}/menu/${category}`;
-  const res = await fetch(url, { method: 'GET' });
+  const url = `${BASE}/menu/admin?category=${encodeURIComponent(category)}`;
+  const res = await fetch(url, { method: 'GET', headers: getAuthHeaders() });
   if (!res.ok) {
     throw new Error(`Fetch error: ${res.status} ${res.statusText}`);
   }